@@ -0,0 +1,28 @@
+import timeit
+
+from gol import GOLState
+from run_gol import run_gol
+
+
+######## Engine Benchmark ########
+
+def benchmark(sizes=((100, 200), (1000, 50), (4000, 5)), engines=("numpy", "packed"), repeat: int = 3) -> dict:
+    """
+    Times full run_gol trajectories of a random soup on each engine, best of `repeat` runs.
+    + sizes: (board side, generations) pairs
+    return: {(side, T): {engine: seconds}}
+    """
+    timings = {}
+    for side, T in sizes:
+        state = GOLState.random_init(height=side, width=side, seed=0)
+        timings[(side, T)] = {engine: min(timeit.repeat(lambda: run_gol(state, T=T, engine=engine), number=1,
+                                                        repeat=repeat))
+                              for engine in engines}
+    return timings
+
+
+if __name__ == "__main__":
+    for (side, T), times in benchmark().items():
+        speedup = times["numpy"] / times["packed"]
+        print(f"{side}x{side}, T={T}: " + ", ".join(f"{e} {t * 1e3:.1f} ms" for e, t in times.items())
+              + f", packed speedup {speedup:.1f}x")
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from gol import GOLState, GOLGame
+from packed import pack, unpack
+from rules import Rule, get_rule
+from run_gol import run_gol, batched_run_gol
+from storage import save_game, load_game
+
+
+######## Simulation Result Cache ########
+
+def result_key(initial_state: GOLState, rule: Rule = None, wrap: bool = False) -> str:
+    """
+    Content address of a run: the same board, rule and edge handling always give the same trajectory,
+    so the horizon is left out and a longer run can answer any shorter request.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((initial_state.state.shape, str(get_rule(rule)), bool(wrap))).encode())
+    digest.update(np.packbits(initial_state.state).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Memoizes run_gol and batched_run_gol. Trajectories are kept bit-packed in an LRU memory tier
+    and, if a directory is given, as trajectory files in a disk tier. When the disk tier grows
+    past its size limit, the least recently used files are removed.
+    Each entry keeps the longest run seen; shorter requests get a prefix of it.
+    """
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 2**28, max_disk_bytes: int = 2**31):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> (packed frames, width)
+        self._memory_bytes = 0
+        self.hits = self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".golt")
+
+    def get(self, initial_state: GOLState, T: int, rule: Rule = None, wrap: bool = False) -> Optional[GOLGame]:
+        """
+        return: the first T+1 frames of a cached run at least T generations long, or None
+        """
+        key = result_key(initial_state, rule, wrap)
+        if key in self._memory:
+            words, width = self._memory[key]
+            if len(words) > T:
+                self._memory.move_to_end(key)
+                return GOLGame([GOLState(frame) for frame in unpack(words[:T+1], width)])
+        if self.directory is not None and os.path.exists(self._path(key)):
+            game = load_game(self._path(key))
+            if len(game) > T:
+                os.utime(self._path(key))  # mark as recently used for eviction
+                self._remember(key, np.array(game.words), game.header.width)
+                return game[:T+1]
+        return None
+
+    def put(self, initial_state: GOLState, game: GOLGame, rule: Rule = None, wrap: bool = False):
+        """
+        Stores game unless a run at least as long is already cached.
+        """
+        key = result_key(initial_state, rule, wrap)
+        cached = self._memory.get(key)
+        if cached is not None and len(cached[0]) >= len(game):
+            return
+        frames = np.stack([frame.state for frame in game])
+        self._remember(key, pack(frames), frames.shape[-1])
+        if self.directory is not None:
+            path = self._path(key)
+            if os.path.exists(path) and len(load_game(path)) >= len(game):
+                return
+            # write to a temporary file first so readers never see a partial trajectory
+            fd, tmp = tempfile.mkstemp(suffix=".golt.tmp", dir=self.directory)
+            os.close(fd)
+            save_game(game, tmp, rule=str(get_rule(rule)))
+            os.replace(tmp, path)
+            self._evict_disk()
+
+    def _remember(self, key: str, words: np.array, width: int):
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[0].nbytes
+        if words.nbytes > self.max_memory_bytes:
+            return
+        self._memory[key] = (words, width)
+        self._memory_bytes += words.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _evict_disk(self):
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".golt")]
+        entries.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in entries)
+        for path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def run_gol(self, initial_state: GOLState, T=1000, wrap=False, rule=None) -> GOLGame:
+        """
+        Cached run_gol for full trajectories (no lazy or max_period runs).
+        """
+        game = self.get(initial_state, T, rule, wrap)
+        if game is None:
+            self.misses += 1
+            game = run_gol(initial_state, T=T, wrap=wrap, rule=rule)
+            self.put(initial_state, game, rule, wrap)
+        else:
+            self.hits += 1
+        return game
+
+    def batched_run_gol(self, initial_states: List[GOLState], T=1000, wrap=False, num_procs=1,
+                        rule=None) -> List[GOLGame]:
+        """
+        Cached batched_run_gol. Only boards missing from the cache are simulated, and duplicate
+        boards within the batch are simulated once.
+        + rule: one rule for every board or a list of one rule per initial state
+        """
+        single = rule is None or isinstance(rule, (str, Rule))
+        rules = [rule] * len(initial_states) if single else list(rule)
+        gol_games = [None] * len(initial_states)
+        pending = {}  # key -> indices of the boards waiting on that run
+        for i, (initial_state, board_rule) in enumerate(zip(initial_states, rules)):
+            key = result_key(initial_state, board_rule, wrap)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            gol_games[i] = self.get(initial_state, T, board_rule, wrap)
+            if gol_games[i] is None:
+                pending[key] = [i]
+        self.hits += len(initial_states) - len(pending)
+        self.misses += len(pending)
+        if pending:
+            first = [indices[0] for indices in pending.values()]
+            games = batched_run_gol([initial_states[i] for i in first], T=T, wrap=wrap, num_procs=num_procs,
+                                    rule=rule if single else [rules[i] for i in first])
+            for indices, game in zip(pending.values(), games):
+                self.put(initial_states[indices[0]], game, rules[indices[0]], wrap)
+                for i in indices:
+                    gol_games[i] = game
+        return gol_games
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_bytes = 0
+
+
+_default_cache = None
+
+
+def default_cache() -> ResultCache:
+    """
+    return: the process-wide in-memory cache
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
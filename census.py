@@ -0,0 +1,159 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from measurements import CycleDetector
+from patterns import _phases, crop, identify
+
+
+######## Object Census ########
+
+KINDS = ("still_life", "oscillator", "spaceship", "other")
+
+
+def _max_filter(labels: np.array, reach: int) -> np.array:
+    # max over the (2*reach+1)^2 window around every cell, separably along rows then columns
+    pad = [(0, 0)] * (labels.ndim - 2) + [(reach, reach), (reach, reach)]
+    padded = np.pad(labels, pad)
+    height, width = labels.shape[-2:]
+    rows = padded[..., :height, :].copy()
+    for dy in range(1, 2 * reach + 1):
+        np.maximum(rows, padded[..., dy:dy+height, :], out=rows)
+    out = rows[..., :width].copy()
+    for dx in range(1, 2 * reach + 1):
+        np.maximum(out, rows[..., dx:dx+width], out=out)
+    return out
+
+
+def label_components(frames: np.array, reach: int = 2) -> np.array:
+    """
+    Labels groups of live cells, joining any two cells within Chebyshev distance `reach`
+    (reach=1 is 8-connectivity; reach=2 also joins objects close enough to interact).
+    Works on a single board or a batch along leading axes in one vectorized pass.
+    return: int64 array like frames; 0 for dead cells, otherwise a label unique across the whole batch
+    """
+    alive = frames.astype(bool, copy=False)
+    labels = np.where(alive, np.arange(1, alive.size + 1).reshape(alive.shape), 0)
+    while True:
+        spread = np.where(alive, _max_filter(labels, reach), 0)
+        # pointer jumping: take the label held by the cell a label points at
+        flat = spread.reshape(-1)
+        jumped = np.where(alive, flat[np.maximum(spread, 1) - 1].reshape(spread.shape), 0)
+        spread = np.maximum(spread, jumped)
+        if np.array_equal(spread, labels):
+            return labels
+        labels = spread
+
+
+@dataclass
+class Component:
+    kind: str  # one of KINDS
+    name: Optional[str]  # catalogue name if the pattern is known
+    period: Optional[int]
+    velocity: Tuple[float, float]  # (rows, cols) per generation
+    population: int
+    bbox: np.array  # ((min x, min y), (max x, max y)) as in measurements.BoundingBox
+
+
+def _classify(cells: np.array, max_period: int) -> Tuple[str, Optional[str], Optional[int], Tuple[float, float]]:
+    info = identify(cells)
+    if info is not None and info.period is not None and info.kind != "spaceship":
+        kind = "still_life" if info.period == 1 else info.kind
+        return kind, info.name, info.period, (0.0, 0.0)
+    # unknown patterns, and spaceships whose heading depends on their orientation, run alone
+    # on the unbounded plane until their shape repeats
+    _, period, (dy, dx) = _phases(cells, info.period if info is not None and info.period else max_period)
+    if period is None:
+        return "other", None, None, (0.0, 0.0)
+    kind = "still_life" if period == 1 else "oscillator" if (dy, dx) == (0, 0) else "spaceship"
+    return kind, info.name if info is not None else None, period, (dy / period, dx / period)
+
+
+_classified = {}  # (shape, packed cells) -> classification, shared across calls
+
+
+def classify(cells: np.array, max_period: int = 32) -> Tuple[str, Optional[str], Optional[int], Tuple[float, float]]:
+    """
+    return: (kind, name, period, velocity) of one cropped component; results are cached per
+    orientation rather than by canonical form, since the velocity follows the orientation
+    """
+    cells = crop(cells)
+    key = (cells.shape, np.packbits(cells).tobytes())
+    if key not in _classified:
+        _classified[key] = _classify(cells, max_period)
+    return _classified[key]
+
+
+def census(frame: np.array, reach: int = 2, max_period: int = 32, labels: np.array = None) -> List[Component]:
+    """
+    Splits a board into components and classifies each one.
+    + labels: precomputed label_components(frame) (e.g. from a batched call)
+    """
+    if labels is None:
+        labels = label_components(frame, reach)
+    ids, inverse = np.unique(labels, return_inverse=True)
+    ids, inverse = ids[1:], inverse.reshape(labels.shape) - 1  # drop dead cells (label 0)
+    if len(ids) == 0:
+        return []
+    rows, cols = np.nonzero(labels)
+    owner = inverse[rows, cols]
+    low_r, low_c = np.full(len(ids), labels.shape[0]), np.full(len(ids), labels.shape[1])
+    high_r, high_c = np.zeros(len(ids), dtype=int), np.zeros(len(ids), dtype=int)
+    np.minimum.at(low_r, owner, rows)
+    np.minimum.at(low_c, owner, cols)
+    np.maximum.at(high_r, owner, rows)
+    np.maximum.at(high_c, owner, cols)
+    populations = np.bincount(owner, minlength=len(ids))
+    components = []
+    for i in range(len(ids)):
+        window = (slice(low_r[i], high_r[i] + 1), slice(low_c[i], high_c[i] + 1))
+        cells = crop(inverse[window] == i)
+        kind, name, period, velocity = classify(cells, max_period)
+        bbox = np.array(((low_c[i], low_r[i]), (high_c[i], high_r[i])))
+        components.append(Component(kind, name, period, velocity, int(populations[i]), bbox))
+    return components
+
+
+def batched_census(frames: np.array, reach: int = 2, max_period: int = 32) -> List[List[Component]]:
+    """
+    Census of every board in an (N, H, W) array, labelling the whole batch at once.
+    """
+    labels = label_components(frames, reach)
+    return [census(frame, reach, max_period, labels=board_labels) for frame, board_labels in zip(frames, labels)]
+
+
+def count(components: List[Component]) -> dict:
+    """
+    return: {kind: count} for every kind in KINDS, plus {name: count} for catalogued components
+    """
+    counts = dict.fromkeys(KINDS, 0)
+    counts.update(Counter(c.kind for c in components))
+    counts.update(Counter(c.name for c in components if c.name is not None))
+    return counts
+
+
+class StructureCensus(CycleDetector):
+    """
+    Streaming census of the last frame. Done once the trajectory cycles, since the
+    components no longer change kind from then on. Its period can be shared with
+    StillLifeDetector(cycle=...) and OscillatorDetector(cycle=...) in the same measurement dict.
+    """
+    name = "census"
+    description = "Number of still lifes, oscillators, spaceships and other objects in the final frame."
+
+    def init(self, frame: np.array):
+        super().init(frame)
+        self.last = frame
+
+    def update(self, frame: np.array):
+        if self.done:
+            return
+        super().update(frame)
+        # the engine's frames are views of its whole batch; keep only this board once done
+        self.last = frame.copy() if self.done else frame
+
+    def finalize(self) -> dict:
+        counts = count(census(self.last))
+        return {kind: counts[kind] for kind in KINDS}
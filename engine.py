@@ -0,0 +1,182 @@
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+from gol import GOLState
+from rules import compile_rule
+
+
+######## Dense NumPy Engine ########
+
+def count_neighbors(state: np.array, wrap: bool = False) -> np.array:
+    """
+    Counts the live neighbors of every cell with shifted views of the board.
+    + state: bool array whose last two axes are (height, width)
+    + wrap: if True the board is a torus, otherwise cells past the edge are dead
+    return: uint8 array of the same shape as state
+    """
+    cells = state.astype(np.uint8)
+    if wrap:
+        counts = np.zeros_like(cells)
+        for dy in (-1, 0, 1):
+            rows = np.roll(cells, dy, axis=-2)
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    counts += np.roll(rows, dx, axis=-1)
+        return counts
+    # pad the last two axes with a ring of dead cells and sum the 8 shifted windows
+    pad = [(0, 0)] * (cells.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(cells, pad)
+    height, width = cells.shape[-2:]
+    counts = np.zeros_like(cells)
+    for dy in range(3):
+        for dx in range(3):
+            if dy != 1 or dx != 1:
+                counts += padded[..., dy:dy+height, dx:dx+width]
+    return counts
+
+
+def step(state: np.array, wrap: bool = False, rule=None) -> np.array:
+    """
+    Advances a board (or a stack of boards along the leading axes) by one generation.
+    + rule: B/S rule string, rules.Rule, a sequence of one rule per board along the first axis,
+    or a table from rules.compile_rule; defaults to B3/S23
+    """
+    alive = state.astype(bool, copy=False)
+    counts = count_neighbors(alive, wrap=wrap)
+    table = compile_rule(rule)
+    if table is None:
+        return (counts == 3) | (alive & (counts == 2))
+    if table.ndim == 1:
+        # one comparison per count in B or S, which runs close to the B3/S23 path (a gather is ~3x slower)
+        out = np.zeros_like(alive)
+        for n in np.flatnonzero(table[:9] | table[9:]):
+            equal = counts == n
+            if not table[9 + n]:
+                equal &= ~alive
+            elif not table[n]:
+                equal &= alive
+            out |= equal
+        return out
+    # one table per board: offset each board's index into the flattened (N, 18) table
+    boards = (np.arange(len(table)) * 18).reshape((-1,) + (1,) * (state.ndim - 1))
+    return np.take(table.reshape(-1), counts + np.uint8(9) * alive + boards)
+
+
+def simulate(initial_state: GOLState, T: int = 1000, wrap: bool = False, rule=None) -> list:
+    """
+    Runs T generations from initial_state.
+    return: list of T+1 GOLStates, starting with the initial state
+    """
+    table = compile_rule(rule)
+    frame = initial_state.state.astype(bool)
+    trajectory = [GOLState(frame)]
+    for _ in range(T):
+        frame = step(frame, wrap=wrap, rule=table)
+        trajectory.append(GOLState(frame))
+    return trajectory
+
+
+def simulate_batch(initial_states: np.array, T: int = 1000, wrap: bool = False, rule=None) -> np.array:
+    """
+    Runs T generations of N same-shaped boards as one (N, H, W) tensor.
+    + initial_states: array of shape (N, H, W)
+    + rule: one rule for the whole batch or a sequence of N rules, as in step
+    return: bool array of shape (T+1, N, H, W) holding every frame of every board
+    """
+    rule = compile_rule(rule)
+    frames = np.empty((T+1,) + initial_states.shape, dtype=bool)
+    frames[0] = initial_states
+    for t in range(T):
+        frames[t+1] = step(frames[t], wrap=wrap, rule=rule)
+    return frames
+
+
+class CycleWindow:
+    """
+    The frames of a run looked back on for a cycle: the last max_period of them, or all if max_period
+    is None, keyed by their raw buffer hash. A hash hit only counts once the earlier frame is
+    confirmed equal, so a collision can never report a false cycle.
+    """
+
+    def __init__(self, max_period: int = None, stored: Callable[[int], np.array] = None):
+        """
+        + stored: index -> earlier frame, for callers that keep their frames anyway; otherwise
+        the window keeps a bit-packed copy of each frame it holds
+        """
+        self.max_period = max_period
+        self.stored = stored
+        self.count = 0  # frames added so far
+        self._recent = {}  # hash -> (index, packed frame or None) of the frames in the window
+        self._keys = deque()
+
+    def push(self, frame: np.array) -> Optional[int]:
+        """
+        return: index of an equal frame in the window, or None after adding frame as index count
+        """
+        key = hash(frame.tobytes())
+        packed = np.packbits(frame) if self.stored is None else None
+        seen = self._recent.get(key)
+        if seen is not None:
+            index, earlier = seen
+            if self.stored is not None and np.array_equal(self.stored(index), frame) \
+                    or self.stored is None and np.array_equal(earlier, packed):
+                return index
+        index = self.count
+        self._recent[key] = (index, packed)
+        self._keys.append(key)
+        self.count += 1
+        if self.max_period is not None and len(self._keys) > self.max_period:
+            old = self._keys.popleft()
+            if self._recent.get(old, (None,))[0] == index - self.max_period:
+                del self._recent[old]
+        return None
+
+
+def simulate_until_cycle(initial_state: GOLState, T: int = 1000, max_period: int = 32, wrap: bool = False,
+                         rule=None) -> tuple:
+    """
+    Runs up to T generations, stopping as soon as a frame repeats one of the previous max_period frames.
+    return: (trajectory, transient, period) where trajectory holds frames 0 .. transient+period-1,
+    or every frame with transient and period None if no cycle was found
+    """
+    rule = compile_rule(rule)
+    frame = initial_state.state.astype(bool)
+    trajectory = [GOLState(frame)]
+    window = CycleWindow(max_period, stored=lambda i: trajectory[i].state)
+    window.push(frame)
+    for t in range(1, T+1):
+        frame = step(frame, wrap=wrap, rule=rule)
+        seen = window.push(frame)
+        if seen is not None:
+            return trajectory, seen, t - seen
+        trajectory.append(GOLState(frame))
+    return trajectory, None, None
+
+
+def simulate_batch_until_cycle(initial_states: np.array, T: int = 1000, max_period: int = 32, wrap: bool = False,
+                               rule=None) -> tuple:
+    """
+    Batched simulate_until_cycle over an (N, H, W) array. The batch stops once every board has cycled.
+    return: (frames, transients, periods) where frames has shape (t+1, N, H, W) for the last step t run,
+    and transients/periods are lists holding None for boards that never cycled
+    """
+    rule = compile_rule(rule)
+    n = initial_states.shape[0]
+    frames = [initial_states.astype(bool)]
+    windows = [CycleWindow(max_period, stored=lambda s, i=i: frames[s][i]) for i in range(n)]
+    for window, board in zip(windows, frames[0]):
+        window.push(board)
+    transients, periods = [None] * n, [None] * n
+    pending = set(range(n))
+    for t in range(1, T+1):
+        if not pending:
+            break
+        frames.append(step(frames[-1], wrap=wrap, rule=rule))
+        for i in list(pending):
+            seen = windows[i].push(frames[t][i])
+            if seen is not None:
+                transients[i], periods[i] = seen, t - seen
+                pending.discard(i)
+    return np.stack(frames), transients, periods
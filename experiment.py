@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Tuple, Union
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Tuple, Union
+
+import numpy as np
 
 
 @dataclass
@@ -43,4 +45,115 @@ class HypothesisTest:
 
     @abstractmethod
     def __call__(self, results: Results) -> bool:
-        pass
\ No newline at end of file
+        pass
+
+
+######## Experiment Arms ########
+
+@dataclass
+class Arm:
+    """
+    One value of the independent variable: the boards to simulate and how to measure each game.
+    Arms are run by fused.run_arms.
+    """
+    independent: IndependentVariable
+    initial_states: List[Any]  # GOLStates or soups.SoupSpecs
+    measure: Callable[[Any], Union[float, Tuple[float, ...]]]  # GOLGame -> one value per dependent variable
+    descriptions: Tuple[str, ...]  # one per dependent variable
+    T: int = 1000
+    aggregate: Callable[[List[float]], float] = np.mean
+
+
+######## Adaptive Trial Scheduling ########
+
+@dataclass
+class ArmStats:
+    """
+    Per-trial values of the dependent variable for one value of the independent variable.
+    """
+    value: Any
+    samples: List[float] = field(default_factory=list)
+
+    @property
+    def n(self) -> int:
+        return len(self.samples)
+
+    @property
+    def mean(self) -> float:
+        return float(np.mean(self.samples))
+
+    @property
+    def sem(self) -> float:
+        if self.n < 2:
+            return float("inf")
+        return float(np.std(self.samples, ddof=1) / np.sqrt(self.n))
+
+    def interval(self, z: float = 1.96) -> Tuple[float, float]:
+        return (self.mean - z * self.sem, self.mean + z * self.sem)
+
+
+class AdaptiveTrials:
+    """
+    Runs trials per arm in rounds until every comparison the hypothesis depends on is settled:
+    the z-interval of the difference of two arm means excludes zero (the arms differ) or lies
+    within +-tolerance (the arms are practically equal).
+    Each round, arms in an unsettled comparison get about the number of extra trials that the
+    comparison's current gap suggests it needs (at least batch_size, at most half the arm's trials),
+    so close comparisons get more budget. Arms in no unsettled comparison stop.
+    """
+
+    def __init__(self, run_trials: Callable[[Any, int, int], List[float]], values: List[Any],
+                 comparisons: List[Tuple[int, int]] = None, batch_size: int = 10, min_trials: int = 10,
+                 max_trials: int = 200, z: float = 2.58, tolerance: float = 0.0,
+                 run_round: Callable[[List[Tuple[Any, int, int]]], List[List[float]]] = None):
+        """
+        + run_trials: (value, first trial index, number of trials) -> dependent value of each trial;
+        trial indices count up per arm so trials can be seeded reproducibly
+        + run_round: runs a whole round of run_trials requests at once (e.g. with run_arms);
+        replaces run_trials when given
+        + comparisons: pairs of indices into values to settle, defaults to neighboring values
+        + z: stricter than the usual 1.96 since every comparison is looked at again after each round
+        + tolerance: largest difference of means still counted as a tie, in units of the dependent variable
+        """
+        self.run_trials = run_trials
+        self.run_round = run_round if run_round is not None else lambda requests: [run_trials(*r) for r in requests]
+        self.values = values
+        self.comparisons = comparisons if comparisons is not None else [(i, i + 1) for i in range(len(values) - 1)]
+        self.batch_size = batch_size
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+        self.z = z
+        self.tolerance = tolerance
+
+    def gap(self, a: ArmStats, b: ArmStats) -> float:
+        """
+        return: difference of the means in standard errors
+        """
+        se = np.hypot(a.sem, b.sem)
+        if se == 0:
+            return float("inf")  # both arms are deterministic, the comparison is exact
+        return abs(a.mean - b.mean) / se
+
+    def tied(self, a: ArmStats, b: ArmStats) -> bool:
+        return abs(a.mean - b.mean) + self.z * np.hypot(a.sem, b.sem) < self.tolerance
+
+    def __call__(self) -> List[ArmStats]:
+        arms = [ArmStats(value) for value in self.values]
+        requests = {i: self.min_trials for i in range(len(arms))}
+        while requests:
+            rounds = self.run_round([(arms[i].value, arms[i].n, n) for i, n in requests.items()])
+            for i, samples in zip(requests, rounds):
+                arms[i].samples.extend(samples)
+            requests = {}
+            for i, j in self.comparisons:
+                gap = self.gap(arms[i], arms[j])
+                if gap > self.z or self.tied(arms[i], arms[j]):
+                    continue
+                for k in (i, j):
+                    n = arms[k].n
+                    # trials needed scale with (z / gap)^2
+                    needed = n * (self.z / gap) ** 2 - n if gap > 0 else float("inf")
+                    extra = int(min(max(needed, self.batch_size), max(n // 2, self.batch_size), self.max_trials - n))
+                    if extra > 0:
+                        requests[k] = max(requests.get(k, 0), extra)
+        return arms
@@ -1,5 +1,7 @@
 from experiment import *
-from gol import GOLState, GOLGame, batched_run_gol
+from fused import DeclarativeExperiment, run_arms
+from gol import GOLState, GOLGame
+from soups import spawn_soups
 
 
 hypothesis = Hypothesis(
@@ -26,24 +28,43 @@ class Results:
     results: List[Tuple[IndependentVariable, DependentVariable]]
 
 class Experiment:
+    densities = [0.1, 0.2, 0.3, 0.4, 0.5]
+    seed = 0
+    tolerance = 50  # live cells; closer averages count as equal
+    max_trials = 100
+
     def __init__(self, hypothesis: Hypothesis):
         self.hypothesis = hypothesis
 
     def __call__(self) -> Results:
-        densities = [0.1, 0.2, 0.3, 0.4, 0.5]
+        # trials run in rounds until neighboring densities are told apart, tied, or max_trials is hit;
+        # every round runs all of its densities as one fused batch
+        arms = AdaptiveTrials(self.trials, self.densities, tolerance=self.tolerance, max_trials=self.max_trials,
+                              run_round=self.run_round)()
         results = []
-        for density in densities:
-            avg_live_cells = self.run_simulations(density)
-            indep_var = IndependentVariable(value=density, description="Initial density of live cells")
-            dep_var = DependentVariable(value=avg_live_cells, description="Average number of live cells after 1000 steps")
+        for arm in arms:
+            indep_var = IndependentVariable(value=arm.value, description="Initial density of live cells")
+            dep_var = DependentVariable(value=arm.mean, description="Average number of live cells after 1000 steps")
             results.append((indep_var, dep_var))
         return Results(results=results)
 
+    def arm(self, density, start, n) -> Arm:
+        # trial i of a density is always the same seeded soup, so reruns hit the cache
+        soups = spawn_soups((self.seed, int(round(density * 1000))), n, density=density, start=start)
+        return Arm(IndependentVariable(value=density, description="Initial density of live cells"), soups,
+                   self.count_live_cells, ("Average number of live cells after 1000 steps",))
+
+    def run_round(self, requests):
+        return [[value for value, in samples] for samples in run_arms([self.arm(*request) for request in requests])]
+
+    def trials(self, density, start, n):
+        return self.run_round([(density, start, n)])[0]
+
+    def count_live_cells(self, game):
+        return np.sum(game[-1].state)
+
     def run_simulations(self, density):
-        initial_states = [GOLState.random_init(p=[1-density, density]) for _ in range(50)]
-        games = batched_run_gol(initial_states)
-        live_cells_counts = [np.sum(game.trajectory[-1].state) for game in games]
-        return np.mean(live_cells_counts)
+        return np.mean(self.trials(density, 0, 50))
 
 
 class HypothesisTest:
@@ -75,15 +96,8 @@ def e1():
 
 
 class NewExperiment(Experiment):
-        def __call__(self) -> Results:
-            densities = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
-            results = []
-            for density in densities:
-                avg_live_cells = self.run_simulations(density)
-                indep_var = IndependentVariable(value=density, description="Initial density of live cells")
-                dep_var = DependentVariable(value=avg_live_cells, description="Average number of live cells after 1000 steps")
-                results.append((indep_var, dep_var))
-            return Results(results=results)
+    densities = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
+
 
 def e2():
     # Define new hypothesis
@@ -103,15 +117,7 @@ def e2():
 
 
 class FurtherRefinementExperiment(Experiment):
-    def __call__(self) -> Results:
-        densities = [0.38, 0.39, 0.4, 0.41, 0.42]
-        results = []
-        for density in densities:
-            avg_live_cells = self.run_simulations(density)
-            indep_var = IndependentVariable(value=density, description="Initial density of live cells")
-            dep_var = DependentVariable(value=avg_live_cells, description="Average number of live cells after 1000 steps")
-            results.append((indep_var, dep_var))
-        return Results(results=results)
+    densities = [0.38, 0.39, 0.4, 0.41, 0.42]
 
 
 def e3():
@@ -131,33 +137,26 @@ def e3():
         print(f"Initial density: {indep_var.value}, Average live cells: {dep_var.value}")
 
 
-class StabilityExperiment(Experiment):
-    def __call__(self) -> Results:
+class StabilityExperiment(DeclarativeExperiment):
+    def arms(self):
         patterns = ['random', 'glider', 'still_life', 'oscillator']
-        results = []
-        for pattern in patterns:
-            stability = self.run_simulations(pattern)
-            indep_var = IndependentVariable(value=pattern, description="Initial pattern of live cells")
-            dep_var = DependentVariable(value=stability, description="Stability after 1000 steps")
-            results.append((indep_var, dep_var))
-        return Results(results=results)
+        return [Arm(IndependentVariable(value=pattern, description="Initial pattern of live cells"),
+                    self.initial_states(pattern), self.calculate_stability, ("Stability after 1000 steps",))
+                for pattern in patterns]
 
-    def run_simulations(self, pattern):
+    def initial_states(self, pattern):
         if pattern == 'random':
-            initial_states = [GOLState.random_init() for _ in range(50)]
+            return [GOLState.random_init() for _ in range(50)]
         elif pattern == 'glider':
-            initial_states = [self.create_glider() for _ in range(50)]
+            return [self.create_glider() for _ in range(50)]
         elif pattern == 'still_life':
-            initial_states = [self.create_still_life() for _ in range(50)]
+            return [self.create_still_life() for _ in range(50)]
         elif pattern == 'oscillator':
-            initial_states = [self.create_oscillator() for _ in range(50)]
-        games = batched_run_gol(initial_states)
-        stability_counts = [self.calculate_stability(game) for game in games]
-        return np.mean(stability_counts)
+            return [self.create_oscillator() for _ in range(50)]
 
     def calculate_stability(self, game):
-        initial_state = game.trajectory[0].state
-        final_state = game.trajectory[-1].state
+        initial_state = game[0].state
+        final_state = game[-1].state
         unchanged_cells = np.sum(initial_state == final_state)
         total_cells = initial_state.size
         return unchanged_cells / total_cells
@@ -212,35 +211,28 @@ def e4():
     print(f"Hypothesis is {'supported' if hypothesis_result else 'not supported'} by the results.")
 
 
-class InteractionExperiment(Experiment):
-    def __call__(self) -> Results:
+class InteractionExperiment(DeclarativeExperiment):
+    def arms(self):
         configurations = ['single_random', 'single_glider', 'single_still_life', 'single_oscillator', 'multiple']
-        results = []
-        for config in configurations:
-            stability = self.run_simulations(config)
-            indep_var = IndependentVariable(value=config, description="Initial configuration of patterns")
-            dep_var = DependentVariable(value=stability, description="Stability after 1000 steps")
-            results.append((indep_var, dep_var))
-        return Results(results=results)
+        return [Arm(IndependentVariable(value=config, description="Initial configuration of patterns"),
+                    self.initial_states(config), self.calculate_stability, ("Stability after 1000 steps",))
+                for config in configurations]
 
-    def run_simulations(self, config):
+    def initial_states(self, config):
         if config == 'single_random':
-            initial_states = [GOLState.random_init() for _ in range(50)]
+            return [GOLState.random_init() for _ in range(50)]
         elif config == 'single_glider':
-            initial_states = [self.create_glider() for _ in range(50)]
+            return [self.create_glider() for _ in range(50)]
         elif config == 'single_still_life':
-            initial_states = [self.create_still_life() for _ in range(50)]
+            return [self.create_still_life() for _ in range(50)]
         elif config == 'single_oscillator':
-            initial_states = [self.create_oscillator() for _ in range(50)]
+            return [self.create_oscillator() for _ in range(50)]
         elif config == 'multiple':
-            initial_states = [self.create_multiple() for _ in range(50)]
-        games = batched_run_gol(initial_states)
-        stability_counts = [self.calculate_stability(game) for game in games]
-        return np.mean(stability_counts)
+            return [self.create_multiple() for _ in range(50)]
 
     def calculate_stability(self, game):
-        initial_state = game.trajectory[0].state
-        final_state = game.trajectory[-1].state
+        initial_state = game[0].state
+        final_state = game[-1].state
         unchanged_cells = np.sum(initial_state == final_state)
         total_cells = initial_state.size
         return unchanged_cells / total_cells
@@ -303,39 +295,30 @@ def e5():
     print(f"Hypothesis is {'supported' if hypothesis_result else 'not supported'} by the results.")
 
 
-class ClusteringExperiment(Experiment):
-    def __call__(self) -> Results:
+class ClusteringExperiment(DeclarativeExperiment):
+    def arms(self):
         clustering_degrees = ['low', 'medium', 'high']
-        results = []
-        for degree in clustering_degrees:
-            stability, longevity = self.run_simulations(degree)
-            indep_var = IndependentVariable(value=degree, description="Degree of clustering of initial live cells")
-            dep_var_stability = DependentVariable(value=stability, description="Stability after 1000 steps")
-            dep_var_longevity = DependentVariable(value=longevity, description="Longevity (average number of live cells) over 1000 steps")
-            results.append((indep_var, dep_var_stability, dep_var_longevity))
-        return Results(results=results)
+        return [Arm(IndependentVariable(value=degree, description="Degree of clustering of initial live cells"),
+                    self.initial_states(degree), self.measure,
+                    ("Stability after 1000 steps", "Longevity (average number of live cells) over 1000 steps"))
+                for degree in clustering_degrees]
+
+    def initial_states(self, degree):
+        cluster_size = {'low': 1, 'medium': 3, 'high': 5}[degree]
+        return [self.create_clustered_state(cluster_size=cluster_size) for _ in range(50)]
 
-    def run_simulations(self, degree):
-        if degree == 'low':
-            initial_states = [self.create_clustered_state(cluster_size=1) for _ in range(50)]
-        elif degree == 'medium':
-            initial_states = [self.create_clustered_state(cluster_size=3) for _ in range(50)]
-        elif degree == 'high':
-            initial_states = [self.create_clustered_state(cluster_size=5) for _ in range(50)]
-        games = batched_run_gol(initial_states)
-        stability_counts = [self.calculate_stability(game) for game in games]
-        longevity_counts = [self.calculate_longevity(game) for game in games]
-        return np.mean(stability_counts), np.mean(longevity_counts)
+    def measure(self, game):
+        return self.calculate_stability(game), self.calculate_longevity(game)
 
     def calculate_stability(self, game):
-        initial_state = game.trajectory[0].state
-        final_state = game.trajectory[-1].state
+        initial_state = game[0].state
+        final_state = game[-1].state
         unchanged_cells = np.sum(initial_state == final_state)
         total_cells = initial_state.size
         return unchanged_cells / total_cells
 
     def calculate_longevity(self, game):
-        live_cells_counts = [np.sum(state.state) for state in game.trajectory]
+        live_cells_counts = [np.sum(state.state) for state in game]
         return np.mean(live_cells_counts)
 
     def create_clustered_state(self, cluster_size):
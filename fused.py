@@ -0,0 +1,76 @@
+from abc import abstractmethod
+from typing import Any, List, Tuple
+
+from cache import default_cache
+from experiment import Arm, DependentVariable, Experiment, Results
+from soups import SoupSpec
+
+
+######## Fused Execution ########
+
+def _area(board: Any) -> int:
+    height, width = board.shape if isinstance(board, SoupSpec) else board.state.shape
+    return height * width
+
+
+class DeclarativeExperiment(Experiment):
+    """
+    An experiment that declares its arms instead of running them, so execute() can run
+    the arms of one or many experiments as shared batches.
+    """
+
+    @abstractmethod
+    def arms(self) -> List[Arm]:
+        pass
+
+    def __call__(self) -> Results:
+        return execute([self])[0]
+
+
+def run_arms(arms: List[Arm], max_bytes: int = 2**30, num_procs: int = 1) -> List[List[Tuple[float, ...]]]:
+    """
+    Simulates the boards of every arm together, in chunks that cut across arms, through the
+    result cache (so a board shared by several arms runs once).
+    + max_bytes: bound on the frames held at once; sets how many boards go in a chunk
+    return: per arm, the measured value tuple of each of its boards
+    """
+    jobs = sorted(((a, board) for a, arm in enumerate(arms) for board in arm.initial_states), key=lambda job: arms[job[0]].T)
+    samples = [[] for _ in arms]
+    start = 0
+    while start < len(jobs):
+        # jobs are sorted by horizon, so a chunk runs to the horizon of its last job; it grows while
+        # the frames of every board run to that horizon still fit in max_bytes
+        stop, area = start + 1, _area(jobs[start][1])
+        while stop < len(jobs):
+            next_area = max(area, _area(jobs[stop][1]))
+            if (arms[jobs[stop][0]].T + 1) * next_area * (stop - start + 1) > max_bytes:
+                break
+            stop, area = stop + 1, next_area
+        chunk = jobs[start:stop]
+        T = arms[chunk[-1][0]].T
+        states = [board.to_state() if isinstance(board, SoupSpec) else board for _, board in chunk]
+        games = default_cache().batched_run_gol(states, T=T, num_procs=num_procs)
+        for (a, _), game in zip(chunk, games):
+            value = arms[a].measure(game if arms[a].T == T else game[:arms[a].T + 1])
+            samples[a].append(value if isinstance(value, tuple) else (value,))
+        start = stop
+    return samples
+
+
+def execute(experiments: List[DeclarativeExperiment], max_bytes: int = 2**30, num_procs: int = 1) -> List[Results]:
+    """
+    Runs every arm of every experiment as one job and routes the measurements back.
+    return: one Results per experiment, each entry (IndependentVariable, DependentVariable, ...)
+    """
+    arm_lists = [experiment.arms() for experiment in experiments]
+    samples = iter(run_arms([arm for arms in arm_lists for arm in arms], max_bytes=max_bytes, num_procs=num_procs))
+    all_results = []
+    for arms in arm_lists:
+        results = []
+        for arm in arms:
+            columns = list(zip(*next(samples)))
+            dep_vars = [DependentVariable(value=arm.aggregate(column), description=description)
+                        for column, description in zip(columns, arm.descriptions)]
+            results.append((arm.independent, *dep_vars))
+        all_results.append(Results(results=results))
+    return all_results
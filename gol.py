@@ -1,11 +1,14 @@
 from abc import abstractmethod
-from typing import List, Union, Tuple, Any
+from collections import OrderedDict
+from typing import List, Union, Tuple, Any, Callable
 from dataclasses import dataclass
 
 import numpy as np
 from numpy.typing import NDArray
 import imageio
 
+from rle import parse_rle, encode_rle
+
 
 ######## GOL Impl ########
 
@@ -21,11 +24,11 @@ class GOLObject:
 
 @dataclass
 class GOLState:
-    state: np.array  # 2-D numpy array
+    state: np.array  # 2-D bool numpy array
 
     def __init__(self, state: np.array):
         assert len(state.shape) == 2
-        self.state = state
+        self.state = state.astype(bool, copy=False)
 
     def __str__(self):
         return "".join(["".join(["O" if cell else "." for cell in row])+"\n" for row in self.state])
@@ -35,36 +38,48 @@ class GOLState:
             f.write(str(self))
 
     @classmethod
-    def random_init(cls, height=100, width=100, p=[0.5, 0.5]):
-        state = np.random.choice([0, 1], size=(height, width), replace=True, p=p)
-        return cls(state)
+    def random_init(cls, height=100, width=100, p=[0.5, 0.5], seed=None, rng: np.random.Generator = None):
+        """
+        + p: probabilities of a cell starting (dead, alive)
+        + seed, rng: seed or np.random.Generator to draw from; see soups.SoupSpec for per-trial seeds
+        """
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        return cls(rng.random((height, width), dtype=np.float32) < p[1])
 
     @classmethod
     def from_object(cls, structure: GOLObject, height=100, width=100):
+        """
+        raises: ValueError if the RLE is malformed or a live cell falls off the board at (x, y)
+        """
         state = np.zeros((height, width), dtype=bool)
-        lines = structure.rle.split("$")
-        for i, line in enumerate(lines):
-            row = []
-            mul = None
-            for c in line:
-                if c == "!":
-                    break
-                if c == "o":
-                    row += mul * [True] if mul else [True]
-                    mul = None
-                if c == "b":
-                    row += mul * [False] if mul else [False]
-                    mul = None
-                if c.isdigit():
-                    if mul is None:
-                        mul = int(c)
-                    else:
-                        mul = 10*mul + int(c)
-            state[structure.x+i, structure.y:structure.y+len(row)] += np.array(row, dtype=bool)
+        cells, _ = parse_rle(structure.rle)
+        h, w = max(0, min(cells.shape[0], height - structure.x)), max(0, min(cells.shape[1], width - structure.y))
+        if structure.x < 0 or structure.y < 0 or cells[h:].any() or cells[:, w:].any():
+            raise ValueError(f"{structure.rle!r} at ({structure.x}, {structure.y}) does not fit a {height} x {width} board")
+        state[structure.x:structure.x+h, structure.y:structure.y+w] |= cells[:h, :w]
         return cls(state)
 
+    def to_rle(self, rule="B3/S23") -> str:
+        return encode_rle(self.state, rule=rule)
+
+    def to_object(self) -> GOLObject:
+        """
+        Crops the live cells to their bounding box and returns them as a GOLObject anchored at its corner.
+        """
+        rows, cols = self.state.any(axis=1).nonzero()[0], self.state.any(axis=0).nonzero()[0]
+        if len(rows) == 0:
+            return GOLObject(x=0, y=0, rle="!")
+        cells = self.state[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+        return GOLObject(x=int(rows[0]), y=int(cols[0]), rle=encode_rle(cells, header=False, line_width=0))
+
     def __eq__(self, other):
-        return (self.state == other.state).all()
+        if not isinstance(other, GOLState):
+            return NotImplemented
+        return self.state.shape == other.state.shape and np.array_equal(self.state, other.state)
+
+    def __hash__(self):
+        # hashes the raw bool buffer, consistent with __eq__
+        return hash((self.state.shape, self.state.tobytes()))
 
 
 @dataclass
@@ -79,24 +94,144 @@ class GOLGame:
         return cls(trajectory)
 
     def __iter__(self):
-        self.i = 0
-        return self
-    
-    def __next__(self):
-        if self.i >= len(self.trajectory):
-            raise StopIteration
-        else:
-            state = self.trajectory[self.i]
-            self.i += 1
-            return state
+        # a fresh iterator each time so nested and restarted iteration are independent
+        return iter(self.trajectory)
 
     def __len__(self):
         return len(self.trajectory)
         
-    def __get_item__(self, index):
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return GOLGame(self.trajectory[index])
         return self.trajectory[index]
+
+
+class OnDemandGOLGame(GOLGame):
+    """
+    Base of the GOLGames that produce frames on demand instead of holding a list of them;
+    trajectory materializes every frame, so prefer iteration or indexing. Games that stop storing
+    frames once the run enters a cycle set transient and period, and later frames fold onto the cycle.
+    """
+    transient: int = None
+    period: int = None
+
+    @property
+    def trajectory(self) -> List[GOLState]:
+        return list(self)
+
+    @property
+    def num_stored(self) -> int:
+        return len(self)
+
+    def _stored_index(self, i: int) -> int:
+        # index of the stored frame equal to frame i
+        if self.period is None or i < self.num_stored:
+            return i
+        return self.transient + (i - self.transient) % self.period
+
+
+class LazyGOLGame(OnDemandGOLGame):
+    """
+    A GOLGame whose frames are computed on demand by step_fn instead of stored.
+    Every keyframe_interval-th frame is kept so random access replays at most
+    keyframe_interval steps, and the last `window` frames visited are kept in an LRU cache.
+    """
+
+    def __init__(self, initial_state: GOLState, T: int, step_fn: Callable[[np.array], np.array],
+                 keyframe_interval: int = 100, window: int = 16):
+        self.initial_state = initial_state
+        self.T = T
+        self.step_fn = step_fn
+        self.keyframe_interval = keyframe_interval
+        self.window = window
+        self._keyframes = {0: initial_state.state}
+        self._recent = OrderedDict()
+
+    def __len__(self):
+        return self.T + 1
+
+    def _remember(self, i: int, frame: np.array):
+        if self.keyframe_interval and i % self.keyframe_interval == 0:
+            self._keyframes[i] = frame
+        if self.window:
+            self._recent[i] = frame
+            self._recent.move_to_end(i)
+            while len(self._recent) > self.window:
+                self._recent.popitem(last=False)
+
+    def _frames(self, start: int = 0):
+        """
+        Yields frames start, start+1, ... T, replaying from the closest cached frame before start.
+        """
+        cached = [i for i in list(self._keyframes) + list(self._recent) if i <= start]
+        i = max(cached)
+        frame = self._recent[i] if i in self._recent else self._keyframes[i]
+        while True:
+            if i >= start:
+                yield frame
+            if i == self.T:
+                return
+            frame = self.step_fn(frame)
+            i += 1
+            self._remember(i, frame)
+
+    def __iter__(self):
+        return (GOLState(frame) for frame in self._frames())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            if len(indices) == 0:
+                return GOLGame([])
+            if indices.step < 0:
+                return GOLGame([self[i] for i in indices])
+            frames = self._frames(indices.start)
+            selected = [GOLState(frame) for i, frame in zip(range(indices.start, indices.stop), frames)
+                        if (i - indices.start) % indices.step == 0]
+            return GOLGame(selected)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        if index in self._recent:
+            self._recent.move_to_end(index)
+            return GOLState(self._recent[index])
+        return GOLState(next(self._frames(index)))
     
 
+class PeriodicGOLGame(OnDemandGOLGame):
+    """
+    A GOLGame of T+1 frames whose simulation stopped once it entered a cycle.
+    Only frames 0 .. transient+period-1 are stored; later frames are extrapolated
+    from the cycle. period is None if no cycle was found, in which case every frame is stored.
+    """
+
+    def __init__(self, trajectory: List[GOLState], T: int, transient: int = None, period: int = None):
+        self._stored = trajectory
+        self.T = T
+        self.transient = transient
+        self.period = period
+
+    def __len__(self):
+        return self.T + 1
+
+    @property
+    def num_stored(self) -> int:
+        return len(self._stored)
+
+    def __iter__(self):
+        return (self._stored[self._stored_index(i)] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return GOLGame([self[i] for i in range(*index.indices(len(self)))])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        return self._stored[self._stored_index(index)]
+
+
 ######## GOL Strutures ########
 
 class Measurement:
@@ -111,6 +246,36 @@ class Measurement:
         pass
 
 
+class StreamingMeasurement(Measurement):
+    """
+    A Measurement computed online: init with the first frame, update with every later frame, then finalize.
+    Frames are not retained, so an engine can push each frame and discard it.
+    Setting done tells the engine further frames cannot change the result.
+    """
+    done: bool = False
+
+    @abstractmethod
+    def init(self, frame: np.array):
+        pass
+
+    @abstractmethod
+    def update(self, frame: np.array):
+        pass
+
+    @abstractmethod
+    def finalize(self) -> Any:
+        pass
+
+    def __call__(self, game: GOLGame) -> Any:
+        frames = iter(game)
+        self.init(next(frames).state)
+        for frame in frames:
+            if self.done:
+                break
+            self.update(frame.state)
+        return self.finalize()
+
+
 class GOLStructure:
     """
     A GOLObject that satisfies expected_measurements when used to initialize a GOLGame
@@ -126,4 +291,18 @@ class GOLStructure:
         Checks that the given object satisfies the expected \
         measurements for the structure.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def horizon(self) -> int:
+        """
+        Number of frames (initial frame included) the measurements read.
+        """
+        return max([getattr(m, "time_range", 1) for m in self.measurements.values()] + [1])
+
+    @abstractmethod
+    def check(self, game: GOLGame) -> bool:
+        """
+        Evaluates the expected measurements on an already simulated game of at least horizon() frames,
+        so many structures can share one batched simulation (see verify.py).
+        """
+        pass
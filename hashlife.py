@@ -0,0 +1,275 @@
+from typing import Tuple
+
+import numpy as np
+
+from gol import GOLState, GOLObject
+from rle import parse_rle
+from rules import Rule, get_rule
+
+
+######## Hashlife ########
+
+class Node:
+    """
+    Interned quadtree node covering a 2^k x 2^k square. Leaves (k=0) are single cells.
+    a, b, c, d are the NW, NE, SW, SE quadrants and n is the live population.
+    """
+    __slots__ = ("k", "a", "b", "c", "d", "n", "bbox")
+
+    def __init__(self, k, a=None, b=None, c=None, d=None, n=0):
+        self.k = k
+        self.a, self.b, self.c, self.d = a, b, c, d
+        self.n = n
+        self.bbox = None
+
+
+class HashLife:
+    """
+    Memoized quadtree engine for a Life-like rule (B3/S23 by default) on the unbounded plane.
+    Holds the intern table and the successor cache; one instance can be shared by many universes
+    running the same rule. B0 rules are not supported since empty space must stay empty.
+    """
+
+    def __init__(self, rule: Rule = None):
+        self.rule = get_rule(rule)
+        if 0 in self.rule.birth:
+            raise ValueError(f"hashlife cannot run B0 rules: {self.rule}")
+        self._table = self.rule.table
+        self.off = Node(0, n=0)
+        self.on = Node(0, n=1)
+        self._intern = {}
+        self._successors = {}
+        self._empty = [self.off]
+
+    def join(self, a: Node, b: Node, c: Node, d: Node) -> Node:
+        key = (id(a), id(b), id(c), id(d))
+        node = self._intern.get(key)
+        if node is None:
+            node = Node(a.k + 1, a, b, c, d, a.n + b.n + c.n + d.n)
+            self._intern[key] = node
+        return node
+
+    def empty(self, k: int) -> Node:
+        while len(self._empty) <= k:
+            e = self._empty[-1]
+            self._empty.append(self.join(e, e, e, e))
+        return self._empty[k]
+
+    def centre(self, m: Node) -> Node:
+        """
+        Pads m with an empty border, returning the level k+1 node with m at its centre.
+        """
+        z = self.empty(m.k - 1)
+        return self.join(self.join(z, z, z, m.a), self.join(z, z, m.b, z),
+                         self.join(z, m.c, z, z), self.join(m.d, z, z, z))
+
+    def inner(self, m: Node) -> Node:
+        """
+        The level k-1 node at the centre of m.
+        """
+        return self.join(m.a.d, m.b.c, m.c.b, m.d.a)
+
+    def is_padded(self, m: Node) -> bool:
+        # every live cell lies within the central quarter of the central quarter
+        return m.k >= 3 and m.n == self.inner(self.inner(m)).n
+
+    def _life_4x4(self, m: Node) -> Node:
+        cells = [[m.a.a, m.a.b, m.b.a, m.b.b],
+                 [m.a.c, m.a.d, m.b.c, m.b.d],
+                 [m.c.a, m.c.b, m.d.a, m.d.b],
+                 [m.c.c, m.c.d, m.d.c, m.d.d]]
+        bits = [[cell.n for cell in row] for row in cells]
+        out = []
+        for y in (1, 2):
+            for x in (1, 2):
+                count = sum(bits[y+dy][x+dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - bits[y][x]
+                alive = self._table[bits[y][x], count]
+                out.append(self.on if alive else self.off)
+        return self.join(*out)
+
+    def successor(self, m: Node, j: int = None) -> Node:
+        """
+        Returns the level k-1 centre of m advanced 2^j generations (j defaults to k-2, its maximum).
+        """
+        j = m.k - 2 if j is None else min(j, m.k - 2)
+        key = (id(m), j)
+        s = self._successors.get(key)
+        if s is not None:
+            return s
+        if m.n == 0:
+            s = m.a
+        elif m.k == 2:
+            s = self._life_4x4(m)
+        else:
+            join, nxt = self.join, self.successor
+            c1 = nxt(join(m.a.a, m.a.b, m.a.c, m.a.d), j)
+            c2 = nxt(join(m.a.b, m.b.a, m.a.d, m.b.c), j)
+            c3 = nxt(join(m.b.a, m.b.b, m.b.c, m.b.d), j)
+            c4 = nxt(join(m.a.c, m.a.d, m.c.a, m.c.b), j)
+            c5 = nxt(join(m.a.d, m.b.c, m.c.b, m.d.a), j)
+            c6 = nxt(join(m.b.c, m.b.d, m.d.a, m.d.b), j)
+            c7 = nxt(join(m.c.a, m.c.b, m.c.c, m.c.d), j)
+            c8 = nxt(join(m.c.b, m.d.a, m.c.d, m.d.c), j)
+            c9 = nxt(join(m.d.a, m.d.b, m.d.c, m.d.d), j)
+            if j < m.k - 2:
+                s = join(join(c1.d, c2.c, c4.b, c5.a), join(c2.d, c3.c, c5.b, c6.a),
+                         join(c4.d, c5.c, c7.b, c8.a), join(c5.d, c6.c, c8.b, c9.a))
+            else:
+                s = join(nxt(join(c1, c2, c4, c5), j), nxt(join(c2, c3, c5, c6), j),
+                         nxt(join(c4, c5, c7, c8), j), nxt(join(c5, c6, c8, c9), j))
+        self._successors[key] = s
+        return s
+
+    def from_array(self, cells: np.array) -> Node:
+        """
+        Builds the smallest node (level >= 3) holding cells in its upper left corner.
+        """
+        height, width = cells.shape
+        k = max(3, int(np.ceil(np.log2(max(height, width, 1)))))
+        size = 2 ** k
+        padded = np.zeros((size, size), dtype=bool)
+        padded[:height, :width] = cells
+        return self._build(padded, k)
+
+    def _build(self, block: np.array, k: int) -> Node:
+        if not block.any():
+            return self.empty(k)
+        if k == 0:
+            return self.on
+        h = block.shape[0] // 2
+        return self.join(self._build(block[:h, :h], k - 1), self._build(block[:h, h:], k - 1),
+                         self._build(block[h:, :h], k - 1), self._build(block[h:, h:], k - 1))
+
+    def fill(self, m: Node, out: np.array, top: int, left: int):
+        """
+        Writes the live cells of m into out, with m's upper left corner at (top, left) in out's coordinates.
+        Cells falling outside out are dropped.
+        """
+        size = 2 ** m.k
+        if m.n == 0 or top >= out.shape[0] or left >= out.shape[1] or top + size <= 0 or left + size <= 0:
+            return
+        if m.k == 0:
+            out[top, left] = True
+            return
+        h = size // 2
+        self.fill(m.a, out, top, left)
+        self.fill(m.b, out, top, left + h)
+        self.fill(m.c, out, top + h, left)
+        self.fill(m.d, out, top + h, left + h)
+
+    def bounding_box(self, m: Node) -> Tuple[int, int, int, int]:
+        """
+        return: (min row, min col, max row, max col) of live cells relative to m's corner, None if empty
+        """
+        if m.n == 0:
+            return None
+        if m.bbox is None:
+            if m.k == 0:
+                m.bbox = (0, 0, 0, 0)
+            else:
+                h = 2 ** (m.k - 1)
+                boxes = []
+                for child, dy, dx in ((m.a, 0, 0), (m.b, 0, h), (m.c, h, 0), (m.d, h, h)):
+                    box = self.bounding_box(child)
+                    if box is not None:
+                        boxes.append((box[0] + dy, box[1] + dx, box[2] + dy, box[3] + dx))
+                m.bbox = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                          max(b[2] for b in boxes), max(b[3] for b in boxes))
+        return m.bbox
+
+    def clear(self):
+        """
+        Drops the successor cache; useful between unrelated long runs.
+        """
+        self._successors.clear()
+
+
+_default_engines = {}
+
+
+def default_engine(rule: Rule = None) -> HashLife:
+    """
+    return: the process-wide engine for rule, so universes on the same rule share one cache
+    """
+    rule = get_rule(rule)
+    if rule not in _default_engines:
+        _default_engines[rule] = HashLife(rule)
+    return _default_engines[rule]
+
+
+class HashLifeUniverse:
+    """
+    An unbounded GOL plane backed by a quadtree root.
+    (top, left) is the plane coordinate of the root's upper left corner, so
+    plane coordinates stay fixed as the root is padded and advanced.
+    """
+
+    def __init__(self, root: Node, top: int = 0, left: int = 0, generation: int = 0, engine: HashLife = None):
+        self.root = root
+        self.top = top
+        self.left = left
+        self.generation = generation
+        self.engine = engine if engine is not None else default_engine()
+
+    @classmethod
+    def from_state(cls, gol_state: GOLState, engine: HashLife = None, rule: Rule = None):
+        """
+        + rule: picks the shared engine for that rule when no engine is given
+        """
+        engine = engine if engine is not None else default_engine(rule)
+        return cls(engine.from_array(gol_state.state), engine=engine)
+
+    @classmethod
+    def from_object(cls, gol_object: GOLObject, engine: HashLife = None, rule: Rule = None):
+        cells, _ = parse_rle(gol_object.rle)
+        state = GOLState.from_object(gol_object, height=gol_object.x + cells.shape[0], width=gol_object.y + cells.shape[1])
+        return cls.from_state(state, engine=engine, rule=rule)
+
+    def _pad(self, root: Node, top: int, left: int):
+        half = 2 ** (root.k - 1)
+        return self.engine.centre(root), top - half, left - half
+
+    def step_pow2(self, j: int):
+        """
+        return: a new universe advanced 2^j generations
+        """
+        root, top, left = self.root, self.top, self.left
+        while root.k < j + 3 or not self.engine.is_padded(root):
+            root, top, left = self._pad(root, top, left)
+        quarter = 2 ** (root.k - 2)
+        root = self.engine.successor(root, j)
+        return HashLifeUniverse(root, top + quarter, left + quarter, self.generation + 2 ** j, self.engine)
+
+    def advance(self, generations: int):
+        """
+        return: a new universe advanced by any number of generations, in O(log generations) jumps
+        """
+        universe = self
+        j = 0
+        while generations:
+            if generations & 1:
+                universe = universe.step_pow2(j)
+            generations >>= 1
+            j += 1
+        return universe
+
+    def population(self) -> int:
+        return self.root.n
+
+    def bounding_box(self) -> np.array:
+        """
+        return: np.array of size (2, 2) as in measurements.BoundingBox, ((min x, min y), (max x, max y))
+        in plane coordinates where x is the column and y the row
+        """
+        box = self.engine.bounding_box(self.root)
+        if box is None:
+            return np.array([[0, 0], [0, 0]])
+        return np.array(((self.left + box[1], self.top + box[0]), (self.left + box[3], self.top + box[2])))
+
+    def to_state(self, height: int, width: int, top: int = 0, left: int = 0) -> GOLState:
+        """
+        Materializes the height x width window whose upper left corner is at plane coordinate (top, left).
+        """
+        out = np.zeros((height, width), dtype=bool)
+        self.engine.fill(self.root, out, self.top - top, self.left - left)
+        return GOLState(out)
@@ -1,8 +1,65 @@
-from typing import List, Tuple
+from functools import cached_property
+from itertools import islice
+from typing import List, Tuple, Dict, Any
 import numpy as np
 from dataclasses import dataclass
 
-from gol import Measurement, GOLGame
+from gol import Measurement, StreamingMeasurement, GOLGame
+from engine import CycleWindow
+
+
+class TrajectoryStats:
+    """
+    Per-frame statistics of a trajectory computed with reductions over the stacked (T, H, W) frames.
+    Each statistic is computed at most once and shared by every measurement reading it.
+    """
+
+    def __init__(self, game: GOLGame, time_range: int = None):
+        self.frames = np.stack([frame.state for frame in islice(game, time_range)])
+
+    @cached_property
+    def populations(self) -> np.array:
+        return self.frames.sum(axis=(1, 2))
+
+    @cached_property
+    def bboxes(self) -> np.array:
+        """
+        return: int array of shape (T, 2, 2) where res[t] is BoundingBox.frame_bbox of frame t
+        """
+        rows = self.frames.any(axis=2)  # (T, H)
+        cols = self.frames.any(axis=1)  # (T, W)
+        height, width = rows.shape[1], cols.shape[1]
+        boxes = np.stack((
+            np.stack((cols.argmax(axis=1), rows.argmax(axis=1)), axis=1),
+            np.stack((width - 1 - cols[:, ::-1].argmax(axis=1), height - 1 - rows[:, ::-1].argmax(axis=1)), axis=1),
+        ), axis=1)
+        boxes[self.populations == 0] = 0
+        return boxes
+
+
+def frame_bbox(frame: np.array) -> np.array:
+    """
+    + frame: frame to compute bbox of
+    return: np.array of size (2, 2) where res[0] is the upper left point
+    """
+    ys, xs = frame.nonzero()
+    return np.array(((np.min(xs), ys[0]), (np.max(xs), ys[-1]))) if len(xs) > 0 else np.array([[0, 0], [0, 0]])
+
+
+def bbox_dist(box1: np.array, box2: np.array) -> np.array:
+    """
+    Largest displacement of a bbox corner; broadcasts over leading axes.
+    """
+    return np.max(np.linalg.norm(box1 - box2, ord=2, axis=-1), axis=-1)
+
+
+def measure(game: GOLGame, measurements: Dict[str, Measurement]) -> Dict[str, Any]:
+    """
+    Runs several measurements over one shared TrajectoryStats covering the longest time_range.
+    """
+    time_range = max(getattr(m, "time_range", None) or len(game) for m in measurements.values())
+    stats = TrajectoryStats(game, time_range)
+    return {name: m.from_stats(stats) if hasattr(m, "from_stats") else m(game) for name, m in measurements.items()}
 
 
 @dataclass
@@ -16,11 +73,13 @@ class BoundingBox(Measurement):
         + frame: frame to compute bbox of
         return: np.array of size (2, 2) where res[0] is the upper left point
         """
-        ys, xs = frame.nonzero()
-        return np.array(((np.min(xs), ys[0]), (np.max(xs), ys[-1]))) if len(xs) > 0 else np.array([[0, 0], [0, 0]])
+        return frame_bbox(frame)
+
+    def from_stats(self, stats: TrajectoryStats) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        return list(stats.bboxes[:self.time_range])
 
     def __call__(self, game: GOLGame) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
-        return [self.frame_bbox(frame.state) for i, frame in enumerate(game) if i < self.time_range]
+        return self.from_stats(TrajectoryStats(game, self.time_range))
 
 
 @dataclass
@@ -31,12 +90,14 @@ between initial bbox and next bbox."
     time_range: int  # max time from initial condition to track velocity
 
     def bbox_dist(self, box1, box2):
-        return np.max(np.linalg.norm(box1 - box2, ord=2, axis=1))
+        return bbox_dist(box1, box2)
+
+    def from_stats(self, stats: TrajectoryStats) -> List[float]:
+        bboxes = stats.bboxes[:self.time_range]
+        return list(bbox_dist(bboxes[1:], bboxes[:-1]))
 
     def __call__(self, game: GOLGame) -> List[float]:
-        bbox_m = BoundingBox(time_range=self.time_range)
-        bboxes = bbox_m(game)
-        return [self.bbox_dist(box1, box2) for box1, box2 in zip(bboxes[:-1], bboxes[1:])]
+        return self.from_stats(TrajectoryStats(game, self.time_range))
 
 
 @dataclass
@@ -47,9 +108,143 @@ between initial bbox and bbox at 'time_range' future step and dividing by 'time_
     time_range: int  # max time from initial condition to track velocity
 
     def bbox_dist(self, box1, box2):
-        return np.max(np.linalg.norm(box1 - box2, ord=2, axis=1))
+        return bbox_dist(box1, box2)
 
-    def __call__(self, game: GOLGame) -> List[float]:
-        bbox_m = BoundingBox(time_range=self.time_range)
-        bboxes = bbox_m(game)
-        return self.bbox_dist(bboxes[0], bboxes[-1])# / self.time_range
\ No newline at end of file
+    def from_stats(self, stats: TrajectoryStats) -> float:
+        bboxes = stats.bboxes[:self.time_range]
+        return bbox_dist(bboxes[0], bboxes[-1])# / self.time_range
+
+    def __call__(self, game: GOLGame) -> float:
+        return self.from_stats(TrajectoryStats(game, self.time_range))
+
+
+######## Streaming Measurements ########
+
+class FinalPopulation(StreamingMeasurement):
+    name = "final_population"
+    description = "Number of live cells in the last frame."
+
+    def init(self, frame: np.array):
+        self.population = int(frame.sum())
+
+    def update(self, frame: np.array):
+        self.population = int(frame.sum())
+
+    def finalize(self) -> int:
+        return self.population
+
+
+class MeanPopulation(StreamingMeasurement):
+    name = "mean_population"
+    description = "Average number of live cells over all frames."
+
+    def init(self, frame: np.array):
+        self.total = int(frame.sum())
+        self.count = 1
+
+    def update(self, frame: np.array):
+        self.total += int(frame.sum())
+        self.count += 1
+
+    def finalize(self) -> float:
+        return self.total / self.count
+
+
+class ChangeFromInitial(StreamingMeasurement):
+    name = "change_from_initial"
+    description = "Fraction of cells whose value in the last frame equals their value in the first frame."
+
+    def init(self, frame: np.array):
+        self.initial = frame.copy()
+        self.last = frame
+
+    def update(self, frame: np.array):
+        self.last = frame
+
+    def finalize(self) -> float:
+        return np.sum(self.initial == self.last) / self.initial.size
+
+
+@dataclass
+class StreamingBoundingBox(StreamingMeasurement):
+    name = "bounding_box"
+    description = "Bounding box of all live cells over the first 'time_range' frames."
+    time_range: int
+
+    def init(self, frame: np.array):
+        self.bboxes = [frame_bbox(frame)]
+        self.done = self.time_range <= 1
+
+    def update(self, frame: np.array):
+        if self.done:
+            return
+        self.bboxes.append(frame_bbox(frame))
+        self.done = len(self.bboxes) >= self.time_range
+
+    def finalize(self) -> List[np.array]:
+        return self.bboxes
+
+
+@dataclass
+class CycleDetector(StreamingMeasurement):
+    name = "cycle"
+    description = "Period of the first cycle the trajectory enters, None if it never repeats a frame."
+    max_period: int = 32  # only look this many frames back, None to remember every frame
+
+    def init(self, frame: np.array):
+        self.t = 0
+        self.window = CycleWindow(self.max_period)
+        self.window.push(frame)
+        self.period = None
+        self.done = False
+
+    def update(self, frame: np.array):
+        if self.done:
+            return
+        self.t += 1
+        seen = self.window.push(frame)
+        if seen is not None:
+            self.period = self.t - seen
+            self.done = True
+            self.window = None  # the period is settled, so the frames looked back on can go
+
+    def finalize(self) -> int:
+        return self.period
+
+
+@dataclass
+class CycleReading(CycleDetector):
+    """
+    A statistic of the cycle period. Given cycle, another CycleDetector the engine feeds for the
+    same board (e.g. a census.StructureCensus in the same measurement dict), it reads that detector's
+    period instead of keeping a window of its own, so one window serves every statistic of a board.
+    """
+    cycle: CycleDetector = None
+
+    def init(self, frame: np.array):
+        if self.cycle is None:
+            super().init(frame)
+        else:
+            self.period = None
+            self.done = True
+
+    def cycle_period(self) -> int:
+        return self.period if self.cycle is None else self.cycle.period
+
+
+@dataclass
+class StillLifeDetector(CycleReading):
+    name = "is_still"
+    description = "Whether the trajectory reaches a frame equal to the one before it."
+
+    def finalize(self) -> bool:
+        return self.cycle_period() == 1
+
+
+@dataclass
+class OscillatorDetector(CycleReading):
+    name = "is_oscillator"
+    description = "Whether the trajectory ever repeats a frame."
+
+    def finalize(self) -> bool:
+        return self.cycle_period() is not None
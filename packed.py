@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from gol import GOLState
+from rules import Rule, CONWAY, get_rule
+
+
+######## Bit-packed Boards ########
+
+WORD_BITS = 64
+
+
+def pack(state: np.array) -> np.array:
+    """
+    Packs boolean boards into little-endian 64-bit words: bit j of word k holds column 64*k + j.
+    + state: bool array whose last two axes are (height, width)
+    return: uint64 array of shape (..., height, ceil(width / 64))
+    """
+    width = state.shape[-1]
+    num_words = (width + WORD_BITS - 1) // WORD_BITS
+    pad = [(0, 0)] * (state.ndim - 1) + [(0, num_words * WORD_BITS - width)]
+    padded = np.pad(state.astype(bool, copy=False), pad)
+    packed = np.packbits(padded, axis=-1, bitorder="little")
+    return np.ascontiguousarray(packed).view("<u8").astype(np.uint64, copy=False)
+
+
+def unpack(words: np.array, width: int) -> np.array:
+    """
+    Inverse of pack.
+    return: bool array of shape (..., height, width)
+    """
+    as_bytes = np.ascontiguousarray(words.astype("<u8", copy=False)).view(np.uint8)
+    # unpackbits yields 0/1 bytes, which reinterpret as bool without a copy
+    return np.unpackbits(as_bytes, axis=-1, count=width, bitorder="little").view(bool)
+
+
+def _shift_west(words: np.array, width: int, wrap: bool) -> np.array:
+    # cell c receives the value of cell c-1
+    out = words << np.uint64(1)
+    out[..., 1:] |= words[..., :-1] >> np.uint64(WORD_BITS - 1)
+    if wrap:
+        last = np.uint64((width - 1) % WORD_BITS)
+        out[..., 0] |= (words[..., -1] >> last) & np.uint64(1)
+    return out
+
+
+def _shift_east(words: np.array, width: int, wrap: bool) -> np.array:
+    # cell c receives the value of cell c+1
+    out = words >> np.uint64(1)
+    out[..., :-1] |= words[..., 1:] << np.uint64(WORD_BITS - 1)
+    if wrap:
+        last = np.uint64((width - 1) % WORD_BITS)
+        out[..., -1] |= (words[..., 0] & np.uint64(1)) << last
+    return out
+
+
+def _shift_rows(words: np.array, offset: int, wrap: bool) -> np.array:
+    # row r receives the value of row r-offset
+    if wrap:
+        return np.roll(words, offset, axis=-2)
+    out = np.zeros_like(words)
+    if offset > 0:
+        out[..., offset:, :] = words[..., :-offset, :]
+    else:
+        out[..., :offset, :] = words[..., -offset:, :]
+    return out
+
+
+def _valid_mask(width: int) -> np.uint64:
+    tail = width % WORD_BITS
+    return np.uint64((1 << tail) - 1) if tail else np.uint64(2**WORD_BITS - 1)
+
+
+def neighborhood_sum(words: np.array, width: int, wrap: bool = False) -> tuple:
+    """
+    Bit-parallel (SWAR) sum of each 3x3 neighborhood, center included.
+    return: bitplanes (s0, s1, s2, s3) with sum = s0 + 2*s1 + 4*s2 + 8*s3 in [0, 9]
+    """
+    west = _shift_west(words, width, wrap)
+    east = _shift_east(words, width, wrap)
+    # horizontal 3-cell sum per row as 2 bitplanes
+    h0 = west ^ words ^ east
+    h1 = (west & words) | (west & east) | (words & east)
+    up0, up1 = _shift_rows(h0, 1, wrap), _shift_rows(h1, 1, wrap)
+    down0, down1 = _shift_rows(h0, -1, wrap), _shift_rows(h1, -1, wrap)
+    # vertical sum of three 2-bit numbers
+    s0 = up0 ^ h0 ^ down0
+    k0 = (up0 & h0) | (up0 & down0) | (h0 & down0)
+    t = up1 ^ h1 ^ down1
+    m = (up1 & h1) | (up1 & down1) | (h1 & down1)
+    s1 = t ^ k0
+    k1 = t & k0
+    return s0, s1, m ^ k1, m & k1
+
+
+def _sum_equals(planes: tuple, n: int) -> np.array:
+    # mask of cells whose bitplane sum is exactly n
+    out = None
+    for bit, plane in enumerate(planes):
+        term = plane if (n >> bit) & 1 else ~plane
+        out = term if out is None else out & term
+    return out
+
+
+def step_packed(words: np.array, width: int, wrap: bool = False, rule: Rule = None) -> np.array:
+    """
+    Advances packed boards (any leading batch axes) by one generation.
+    With the center counted, a cell is born on a sum in B and survives on a sum in S shifted by one;
+    for B3/S23 that is born on 3, survives on 3 or 4.
+    + rule: B/S rule string or rules.Rule, defaults to B3/S23
+    """
+    rule = get_rule(rule)
+    planes = neighborhood_sum(words, width, wrap=wrap)
+    if rule == CONWAY:
+        s0, s1, s2, s3 = planes
+        low = ~(s2 | s3)
+        three = s0 & s1 & low
+        four = ~s0 & ~s1 & s2 & ~s3
+        out = three | (words & four)
+    else:
+        # sums shared by birth and survival need no mask on the center cell
+        born = set(rule.birth)
+        survive = {n + 1 for n in rule.survival}
+        out = np.zeros_like(words)
+        for n in born | survive:
+            equal = _sum_equals(planes, n)
+            if n not in survive:
+                equal &= ~words
+            elif n not in born:
+                equal &= words
+            out |= equal
+    out[..., -1] &= _valid_mask(width)
+    return out
+
+
+@dataclass
+class PackedGOLState:
+    words: np.array  # uint64 array of shape (height, ceil(width / 64))
+    width: int
+
+    def __init__(self, words: np.array, width: int):
+        assert len(words.shape) == 2
+        self.words = words
+        self.width = width
+
+    @property
+    def shape(self):
+        return (self.words.shape[0], self.width)
+
+    @classmethod
+    def from_state(cls, gol_state: GOLState):
+        return cls(pack(gol_state.state), gol_state.state.shape[1])
+
+    def to_state(self) -> GOLState:
+        return GOLState(unpack(self.words, self.width))
+
+    def step(self, wrap: bool = False, rule: Rule = None):
+        return PackedGOLState(step_packed(self.words, self.width, wrap=wrap, rule=rule), self.width)
+
+    def population(self) -> int:
+        return int(np.bitwise_count(self.words).sum())
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedGOLState):
+            return NotImplemented
+        return self.width == other.width and np.array_equal(self.words, other.words)
+
+    def __hash__(self):
+        return hash((self.width, self.words.shape, self.words.tobytes()))
+
+
+def simulate_packed(initial_state: GOLState, T: int = 1000, wrap: bool = False, rule: Rule = None) -> list:
+    """
+    Runs T generations on the packed representation.
+    return: list of T+1 PackedGOLStates, starting with the initial state
+    """
+    rule = get_rule(rule)
+    frame = PackedGOLState.from_state(initial_state)
+    trajectory = [frame]
+    for _ in range(T):
+        frame = frame.step(wrap=wrap, rule=rule)
+        trajectory.append(frame)
+    return trajectory
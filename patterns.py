@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from gol import GOLState, GOLObject
+from rle import parse_rle
+from sparse import SparseGOLState
+
+
+######## Pattern Catalogue ########
+
+# name -> (kind, rle); kinds are still_life, oscillator, spaceship, methuselah and gun
+CATALOGUE = {
+    "block": ("still_life", "2o$2o!"),
+    "beehive": ("still_life", "b2o$o2bo$b2o!"),
+    "loaf": ("still_life", "b2o$o2bo$bobo$2bo!"),
+    "boat": ("still_life", "2o$obo$bo!"),
+    "tub": ("still_life", "bo$obo$bo!"),
+    "blinker": ("oscillator", "3o!"),
+    "toad": ("oscillator", "b3o$3o!"),
+    "beacon": ("oscillator", "2o$o$3bo$2b2o!"),
+    "glider": ("spaceship", "bo$2bo$3o!"),
+    "lwss": ("spaceship", "bo2bo$o$o3bo$4o!"),
+    "r_pentomino": ("methuselah", "b2o$2o$bo!"),
+    "gosper_glider_gun": ("gun", "24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4bobo$"
+                                 "10bo5bo7bo$11bo3bo$12b2o!"),
+}
+
+MAX_PERIOD = 64  # longest period searched when indexing phases
+
+
+def crop(cells: np.array) -> np.array:
+    rows, cols = cells.any(axis=1).nonzero()[0], cells.any(axis=0).nonzero()[0]
+    if len(rows) == 0:
+        return cells[:0, :0]
+    return cells[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+
+
+def canonical_key(cells: np.array) -> Tuple[int, int, bytes]:
+    """
+    Key of a pattern that is invariant to translation, rotation and reflection:
+    the smallest (height, width, packed bits) over the 8 symmetries of the cropped cells.
+    """
+    cells = crop(cells)
+    variants = []
+    for flipped in (cells, cells.T):
+        for k in range(4):
+            v = np.rot90(flipped, k)
+            variants.append((v.shape[0], v.shape[1], np.packbits(v).tobytes()))
+    return min(variants)
+
+
+@dataclass
+class PatternInfo:
+    name: str
+    kind: str
+    rle: str
+    period: Optional[int] = None  # None for patterns without a repeating phase (methuselahs, guns)
+    displacement: Tuple[int, int] = (0, 0)  # (rows, cols) moved per period, in the catalogue orientation
+    phase: int = 0  # which phase of the pattern was matched
+
+    @property
+    def velocity(self) -> Tuple[float, float]:
+        if not self.period:
+            return (0.0, 0.0)
+        return (self.displacement[0] / self.period, self.displacement[1] / self.period)
+
+    def to_structure(self, x: int = 0, y: int = 0):
+        from structures import KnownStructure
+        return KnownStructure(self, GOLObject(x=x, y=y, rle=self.rle))
+
+
+def _phases(cells: np.array, max_period: int = MAX_PERIOD):
+    """
+    Steps cells on the unbounded plane until the cropped pattern repeats.
+    return: (list of cropped phases, period, (rows, cols) displacement), or (first phase, None, (0, 0))
+    """
+    state = SparseGOLState.from_state(GOLState(cells))
+    first = crop(cells)
+    origin = state.cells.min(axis=0)
+    phases = [first]
+    for t in range(1, max_period + 1):
+        state = state.step()
+        if state.population() == 0:
+            break
+        low, high = state.cells.min(axis=0), state.cells.max(axis=0)
+        current = state.to_state(*(high - low + 1), top=low[0], left=low[1]).state
+        if current.shape == first.shape and np.array_equal(current, first):
+            dy, dx = low - origin
+            return phases, t, (int(dy), int(dx))
+        phases.append(current)
+    return [first], None, (0, 0)
+
+
+class PatternIndex:
+    """
+    Maps the canonical key of every phase of every catalogued pattern to its PatternInfo,
+    so recognizing a component is one dict lookup.
+    """
+
+    def __init__(self, catalogue: Dict[str, Tuple[str, str]] = CATALOGUE):
+        self.patterns = {}
+        self._index = {}
+        for name, (kind, rle) in catalogue.items():
+            self.add(name, kind, rle)
+
+    def add(self, name: str, kind: str, rle: str):
+        cells, _ = parse_rle(rle)
+        periodic = kind in ("still_life", "oscillator", "spaceship")
+        phases, period, displacement = _phases(cells) if periodic else ([crop(cells)], None, (0, 0))
+        self.patterns[name] = PatternInfo(name, kind, rle, period, displacement)
+        for i, phase in enumerate(phases):
+            self._index.setdefault(canonical_key(phase), PatternInfo(name, kind, rle, period, displacement, i))
+
+    def lookup(self, cells: np.array) -> Optional[PatternInfo]:
+        """
+        + cells: bool array holding one pattern anywhere, in any orientation
+        return: the matching PatternInfo or None
+        """
+        return self._index.get(canonical_key(cells))
+
+    def __len__(self):
+        return len(self._index)
+
+
+_default_index = None
+
+
+def default_index() -> PatternIndex:
+    global _default_index
+    if _default_index is None:
+        _default_index = PatternIndex()
+    return _default_index
+
+
+def identify(cells: np.array) -> Optional[PatternInfo]:
+    return default_index().lookup(cells)
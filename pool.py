@@ -0,0 +1,189 @@
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Iterator, Tuple, Union
+
+import numpy as np
+
+from gol import GOLState, GOLGame, PeriodicGOLGame
+from engine import simulate_batch, simulate_batch_until_cycle
+from packed import pack, unpack
+from rules import Rule, get_rule
+from soups import SoupSpec, soup_batch
+
+
+######## Persistent Worker Pool ########
+
+def _worker(tasks: mp.Queue, results: mp.Queue):
+    """
+    Pulls chunks of boards off the shared task queue until it receives None.
+    Boards are read from the caller's shared memory block, or generated here from their
+    SoupSpecs, and the bit-packed frames are written to a new block owned (and unlinked) by the caller.
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, source, shape, start, stop, T, wrap, max_period, rule = task
+        try:
+            if isinstance(source, str):
+                block = SharedMemory(name=source)
+                boards = np.ndarray(shape, dtype=bool, buffer=block.buf)[start:stop].copy()
+                block.close()
+            else:
+                boards = soup_batch(source)
+            transients = periods = None
+            if max_period is None:
+                frames = simulate_batch(boards, T=T, wrap=wrap, rule=rule)
+            else:
+                frames, transients, periods = simulate_batch_until_cycle(boards, T=T, max_period=max_period, wrap=wrap,
+                                                                         rule=rule)
+            words = pack(frames)
+            out = SharedMemory(create=True, size=max(words.nbytes, 1))
+            np.ndarray(words.shape, dtype=words.dtype, buffer=out.buf)[:] = words
+            results.put((task_id, out.name, words.shape, transients, periods, None))
+            out.close()
+        except Exception:
+            results.put((task_id, None, None, None, None, traceback.format_exc()))
+
+
+class GOLPool:
+    """
+    Long-lived worker processes fed from one shared task queue, so a free worker
+    always takes the next chunk instead of waiting on the slowest run of a fixed batch.
+    Boards go in and frames come back through shared memory rather than pickles.
+    """
+
+    def __init__(self, num_procs: int = None):
+        self.num_procs = num_procs or os.cpu_count()
+        # workers inherit the parent's tracker so blocks they create can be unlinked here
+        resource_tracker.ensure_running()
+        self._tasks = mp.Queue()
+        self._results = mp.Queue()
+        # ids are unique across calls, which share the results queue; results of other calls are parked here
+        self._task_ids = itertools.count()
+        self._parked = {}
+        self._procs = [mp.Process(target=_worker, args=(self._tasks, self._results), daemon=True)
+                       for _ in range(self.num_procs)]
+        for p in self._procs:
+            p.start()
+
+    def imap_unordered(self, initial_states: List[Union[GOLState, SoupSpec]], T: int = 1000, wrap: bool = False,
+                       max_period: int = None, chunk_size: int = None, rule=None) -> Iterator[Tuple[int, GOLGame]]:
+        """
+        Runs every board and yields (index into initial_states, GOLGame) in completion order.
+        + initial_states: boards, or SoupSpecs whose boards are generated by the workers themselves
+        + chunk_size: boards per task; defaults to about four tasks per worker
+        + max_period: as in batched_run_gol, yields PeriodicGOLGames
+        + rule: one rule for every board or a list of one rule per initial state
+        """
+        single = rule is None or isinstance(rule, (str, Rule))
+        rules = get_rule(rule) if single else [get_rule(r) for r in rule]
+        groups = {}
+        for i, initial_state in enumerate(initial_states):
+            soup = isinstance(initial_state, SoupSpec)
+            groups.setdefault((soup, initial_state.shape if soup else initial_state.state.shape), []).append(i)
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(initial_states) // (4 * self.num_procs)))
+        blocks, chunks = [], {}
+        for (soup, shape), indices in groups.items():
+            if not soup:
+                boards = np.stack([initial_states[i].state for i in indices]).astype(bool)
+                block = SharedMemory(create=True, size=max(boards.nbytes, 1))
+                np.ndarray(boards.shape, dtype=bool, buffer=block.buf)[:] = boards
+                blocks.append(block)
+            for start in range(0, len(indices), chunk_size):
+                stop = min(start + chunk_size, len(indices))
+                task_id = next(self._task_ids)
+                chunks[task_id] = (indices[start:stop], shape[1])
+                chunk_rule = rules if single else [rules[i] for i in indices[start:stop]]
+                if soup:
+                    # only the specs are pickled; the workers generate the boards
+                    source, source_shape = [initial_states[i] for i in indices[start:stop]], None
+                else:
+                    source, source_shape = block.name, boards.shape
+                self._tasks.put((task_id, source, source_shape, start, stop, T, wrap, max_period, chunk_rule))
+        try:
+            while chunks:
+                task_id, out_name, words_shape, transients, periods, error = self._result(chunks)
+                indices, width = chunks.pop(task_id)
+                if error is not None:
+                    raise RuntimeError(f"GOLPool worker failed:\n{error}")
+                words = self._take(out_name, words_shape)
+                frames = unpack(words, width)
+                for j, i in enumerate(indices):
+                    if max_period is None:
+                        yield i, GOLGame([GOLState(frame) for frame in frames[:, j]])
+                    else:
+                        stop = len(frames) if periods[j] is None else transients[j] + periods[j]
+                        trajectory = [GOLState(frame) for frame in frames[:stop, j]]
+                        yield i, PeriodicGOLGame(trajectory, T, transients[j], periods[j])
+        finally:
+            # if the caller stopped early, wait out this call's tasks so none leak into the next call
+            while chunks:
+                task_id, out_name, words_shape, _, _, _ = self._result(chunks)
+                del chunks[task_id]
+                if out_name is not None:
+                    self._take(out_name, words_shape)
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def _result(self, chunks: dict, timeout: float = 1.0) -> tuple:
+        """
+        return: the next result of a task in chunks, parking results that belong to other calls
+        """
+        for task_id in chunks:
+            if task_id in self._parked:
+                return self._parked.pop(task_id)
+        while True:
+            try:
+                result = self._results.get(timeout=timeout)
+            except queue.Empty:
+                dead = [p.pid for p in self._procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"GOLPool workers {dead} exited with tasks outstanding")
+                continue
+            if result[0] in chunks:
+                return result
+            self._parked[result[0]] = result
+
+    def _take(self, name: str, shape: tuple) -> np.array:
+        out = SharedMemory(name=name)
+        words = np.ndarray(shape, dtype=np.uint64, buffer=out.buf).copy()
+        out.close()
+        out.unlink()
+        return words
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join()
+
+
+_pool = None
+
+
+def get_pool(num_procs: int = None) -> GOLPool:
+    """
+    Returns the process-wide pool, starting it on first use or when num_procs changes.
+    """
+    global _pool
+    num_procs = num_procs or os.cpu_count()
+    if _pool is None or _pool.num_procs != num_procs:
+        if _pool is not None:
+            _pool.close()
+        _pool = GOLPool(num_procs)
+    return _pool
+
+
+@atexit.register
+def _close_pool():
+    if _pool is not None:
+        _pool.close()
@@ -0,0 +1,109 @@
+import re
+from typing import Tuple
+
+import numpy as np
+
+
+######## RLE Codec ########
+
+_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s,]+))?", re.IGNORECASE)
+_TOKEN = re.compile(r"(\d*)([a-zA-Z.$])")
+
+
+def parse_rle(text: str) -> Tuple[np.array, dict]:
+    """
+    Decodes a pattern in RLE. '#' comment lines and the 'x = .., y = .., rule = ..' header are optional,
+    runs may span lines and run counts apply to '$' as well ('3$' ends a row and skips two blank ones).
+    Everything after '!' is ignored. Any cell tag other than 'b' or '.' is read as alive.
+    + text: RLE text, e.g. "x = 3, y = 3, rule = B3/S23\\nbob$2bo$3o!" or just "bob$2bo$3o!"
+    return: (bool array of shape (y, x), header dict with keys x, y, rule; missing values are None)
+    raises: ValueError if live cells fall outside the header's x by y box
+    """
+    header = {"x": None, "y": None, "rule": None}
+    body = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            continue
+        match = _HEADER.match(stripped)
+        if match and not body:
+            header = {"x": int(match.group(1)), "y": int(match.group(2)), "rule": match.group(3)}
+            continue
+        body.append(stripped)
+    body = "".join(body).split("!")[0]
+
+    tokens = _TOKEN.findall(body)
+    if not tokens:
+        return np.zeros((header["y"] or 0, header["x"] or 0), dtype=bool), header
+    counts = np.array([int(n) if n else 1 for n, _ in tokens], dtype=np.int64)
+    tags = np.array([t for _, t in tokens])
+    is_eol = tags == "$"
+    alive = ~is_eol & (tags != "b") & (tags != ".")
+    lengths = np.where(is_eol, 0, counts)
+
+    # row of each token: number of row ends before it; column: cells emitted since the last row end
+    row_ends = np.where(is_eol, counts, 0)
+    rows = np.cumsum(row_ends) - row_ends
+    emitted = np.cumsum(lengths)
+    row_start = np.maximum.accumulate(np.where(is_eol, emitted, 0))
+    cols = emitted - lengths - row_start
+
+    body_height = int(rows[alive].max() + 1) if alive.any() else 0
+    body_width = int((cols + lengths)[alive].max()) if alive.any() else 0
+    height = header["y"] if header["y"] is not None else body_height
+    width = header["x"] if header["x"] is not None else int((cols + lengths).max())
+    # live cells outside the header's x by y box would wrap into the next row or run off the array
+    if body_height > height or body_width > width:
+        raise ValueError(f"RLE body ({body_width} x {body_height}) does not fit its header ({width} x {height})")
+    cells = np.zeros(height * width, dtype=bool)
+    runs = counts[alive]
+    starts = rows[alive] * width + cols[alive]
+    # expand every run into its flat cell indices
+    offsets = np.arange(runs.sum()) - np.repeat(np.cumsum(runs) - runs, runs)
+    cells[np.repeat(starts, runs) + offsets] = True
+    return cells.reshape(height, width), header
+
+
+def _row_tokens(row: np.array) -> list:
+    # run-length tokens for one row with trailing dead cells dropped
+    alive = np.flatnonzero(row)
+    if len(alive) == 0:
+        return []
+    row = row[:alive[-1] + 1]
+    bounds = np.flatnonzero(np.diff(row.view(np.int8))) + 1
+    starts = np.concatenate(([0], bounds))
+    lengths = np.diff(np.concatenate((starts, [len(row)])))
+    return [(f"{n}" if n > 1 else "") + ("o" if row[s] else "b") for s, n in zip(starts, lengths)]
+
+
+def encode_rle(cells: np.array, rule: str = "B3/S23", header: bool = True, line_width: int = 70) -> str:
+    """
+    Encodes a bool array as RLE. Trailing dead cells in a row are dropped and runs of
+    blank rows are merged into one counted '$'.
+    + header: prepend the 'x = .., y = .., rule = ..' line
+    + line_width: wrap the body at this many characters without splitting a token (0 for no wrapping)
+    """
+    tokens = []
+    pending_rows = 0
+    for row in cells:
+        row_tokens = _row_tokens(row)
+        if row_tokens:
+            if pending_rows:
+                tokens.append(f"{pending_rows}$" if pending_rows > 1 else "$")
+            tokens.extend(row_tokens)
+            pending_rows = 0
+        pending_rows += 1
+    tokens.append("!")
+
+    lines, line = [], ""
+    for token in tokens:
+        if line_width and len(line) + len(token) > line_width:
+            lines.append(line)
+            line = ""
+        line += token
+    lines.append(line)
+    body = "\n".join(lines)
+    if not header:
+        return body
+    height, width = cells.shape
+    return f"x = {width}, y = {height}, rule = {rule}\n{body}"
@@ -0,0 +1,75 @@
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Union, Sequence
+
+import numpy as np
+
+
+######## Life-like Rules ########
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    An outer-totalistic Life-like rule: a dead cell with a neighbor count in birth is born,
+    a live cell with a count in survival stays alive.
+    """
+    birth: FrozenSet[int]
+    survival: FrozenSet[int]
+
+    @classmethod
+    def parse(cls, text: str):
+        """
+        Accepts B/S notation ("B3/S23", "b36/s23") and the older S/B form ("23/3").
+        """
+        text = text.strip().upper()
+        match = re.fullmatch(r"B([0-8]*)/S([0-8]*)", text) or re.fullmatch(r"S([0-8]*)/B([0-8]*)", text)
+        if match:
+            if text.startswith("B"):
+                birth, survival = match.groups()
+            else:
+                survival, birth = match.groups()
+        else:
+            match = re.fullmatch(r"([0-8]*)/([0-8]*)", text)
+            if match is None:
+                raise ValueError(f"not a Life-like rule: {text!r}")
+            survival, birth = match.groups()
+        return cls(frozenset(int(c) for c in birth), frozenset(int(c) for c in survival))
+
+    def __str__(self):
+        return "B" + "".join(map(str, sorted(self.birth))) + "/S" + "".join(map(str, sorted(self.survival)))
+
+    @property
+    def table(self) -> np.array:
+        """
+        return: bool lookup table of shape (2, 9) where table[alive, count] is the next state
+        """
+        table = np.zeros((2, 9), dtype=bool)
+        table[0, sorted(self.birth)] = True
+        table[1, sorted(self.survival)] = True
+        return table
+
+
+CONWAY = Rule.parse("B3/S23")
+
+
+def get_rule(rule: Union[str, Rule, None]) -> Rule:
+    if rule is None:
+        return CONWAY
+    if isinstance(rule, Rule):
+        return rule
+    return Rule.parse(rule)
+
+
+def compile_rule(rule: Union[str, Rule, Sequence, np.ndarray, None]) -> np.array:
+    """
+    Compiles a rule into a flat lookup table indexed by 9 * alive + count, or None for Conway's
+    rule so engines can keep their specialized B3/S23 path.
+    A sequence of rules (one per board along a batch axis) compiles to an (N, 18) table.
+    An already compiled table is returned unchanged.
+    """
+    if isinstance(rule, np.ndarray):
+        return rule
+    if rule is None or isinstance(rule, (str, Rule)):
+        rule = get_rule(rule)
+        return None if rule == CONWAY else rule.table.reshape(-1)
+    return np.stack([get_rule(r).table.reshape(-1) for r in rule])
@@ -1,42 +1,216 @@
+import copy
+import os
+import shutil
 import subprocess
-from typing import List
-from tqdm import tqdm
-import multiprocessing as mp
-
-from gol import GOLState, GOLGame
-
-
-def run_gol(initial_state: GOLState, T=1000, out_file="artifacts/run.gif") -> GOLGame:
-    in_file = "artifacts/initial_state.txt"
-    initial_state.to_txt(in_file)
-    command = f"""\
-life \
---in {in_file} \
---max-gen {T} \
---out {out_file} \
-"""
-    subprocess.run(command, shell=True)
-    gol_game = GOLGame.from_gif(out_file)
+import tempfile
+from collections import defaultdict
+from functools import partial
+from typing import List, Dict, Any, Union
+import numpy as np
+
+from gol import GOLState, GOLGame, LazyGOLGame, PeriodicGOLGame, StreamingMeasurement
+from pool import get_pool
+from engine import step, simulate, simulate_batch, simulate_until_cycle, simulate_batch_until_cycle
+from packed import pack, unpack, step_packed
+from rules import Rule, compile_rule
+from soups import SoupSpec
+
+
+def _boards(initial_states: List[Union[GOLState, SoupSpec]]) -> List[GOLState]:
+    return [s.to_state() if isinstance(s, SoupSpec) else s for s in initial_states]
+
+
+def _group_rule(rule, indices: List[int]):
+    # a single rule applies to every group; a per-board list is cut down to the group's boards
+    if rule is None or isinstance(rule, (str, Rule)):
+        return rule
+    return [rule[i] for i in indices]
+
+
+def run_gol(initial_state: GOLState, T=1000, wrap=False, lazy=False, max_period=None, rule=None,
+            engine="numpy") -> GOLGame:
+    """
+    Simulates T generations in-process. No files are touched.
+    + wrap: toroidal board if True, otherwise cells beyond the edge are dead
+    + lazy: return a LazyGOLGame that computes frames on demand instead of storing them
+    + max_period: stop once the board enters a cycle of at most this period and return a PeriodicGOLGame
+    + rule: B/S rule string or rules.Rule, defaults to B3/S23
+    + engine: "numpy" steps bool arrays; "packed" steps 64 cells per word (packed.py) and unpacks
+    every frame once at the end, which pays off on wide boards (see benchmark.py); full runs only
+    """
+    if engine == "packed":
+        if lazy or max_period is not None:
+            raise ValueError("the packed engine only runs full trajectories")
+        width = initial_state.state.shape[1]
+        words = [pack(initial_state.state)]
+        for _ in range(T):
+            words.append(step_packed(words[-1], width, wrap=wrap, rule=rule))
+        return GOLGame([GOLState(frame) for frame in unpack(np.stack(words), width)])
+    if engine != "numpy":
+        raise ValueError(f"unknown engine: {engine!r}")
+    rule = compile_rule(rule)
+    if max_period is not None:
+        trajectory, transient, period = simulate_until_cycle(initial_state, T=T, max_period=max_period, wrap=wrap, rule=rule)
+        return PeriodicGOLGame(trajectory, T, transient, period)
+    if lazy:
+        return LazyGOLGame(initial_state, T, partial(step, wrap=wrap, rule=rule))
+    return GOLGame(simulate(initial_state, T=T, wrap=wrap, rule=rule))
+
+
+def run_life(initial_state: GOLState, T=1000, out_file=None, scratch_dir=None) -> GOLGame:
+    """
+    Simulates with the external `life` binary via a text file and a GIF round trip.
+    Each run works in its own temporary directory, removed afterwards, so concurrent
+    runs and sweeps never share input or output files.
+    + out_file: if given, the GIF is also copied there
+    + scratch_dir: parent of the per-run directory, defaults to the system temp dir
+    """
+    with tempfile.TemporaryDirectory(prefix="gol_run_", dir=scratch_dir) as run_dir:
+        in_file = os.path.join(run_dir, "initial_state.txt")
+        gif_file = os.path.join(run_dir, "run.gif")
+        initial_state.to_txt(in_file)
+        subprocess.run(["life", "--in", in_file, "--max-gen", str(T), "--out", gif_file], check=True)
+        gol_game = GOLGame.from_gif(gif_file)
+        if out_file is not None:
+            shutil.copyfile(gif_file, out_file)
     return gol_game
 
 
-def batched_run_gol(initial_states: List[GOLState], T=1000, num_procs=24) -> List[GOLGame]:
-    num_batches = (len(initial_states) + num_procs - 1) // num_procs
-    batched_states = [initial_states[i*num_procs:(i+1)*num_procs] for i in range(num_batches)]
-    gol_games = []
-    for batch in tqdm(batched_states):
-        procs = []
-        for i, initial_state in enumerate(batch):
-            out_file = f"artifacts/run_{i}.gif"
-            p = mp.Process(target=run_gol, args=(initial_state, T, out_file))
-            procs.append(p)
-            p.start()
-        for i, p in enumerate(procs):
-            p.join()
-            gol_games.append(GOLGame.from_gif(f"artifacts/run_{i}.gif"))
+def batched_run_gol(initial_states: List[Union[GOLState, SoupSpec]], T=1000, wrap=False, max_period=None, num_procs=1,
+                    rule=None) -> List[GOLGame]:
+    """
+    Stacks same-shaped boards into one (N, H, W) array and advances them together.
+    Boards of different shapes are grouped and each group runs as its own batch.
+    + initial_states: boards or SoupSpecs; with num_procs > 1 soups are generated inside the workers
+    + max_period: stop each group once all its boards have cycled and return PeriodicGOLGames
+    + num_procs: if > 1, split the boards into chunks run by the persistent worker pool
+    + rule: one rule for every board, or a list of one rule per initial state so a rule sweep
+    runs as a single batch
+    return: one GOLGame per initial state, in input order
+    """
+    if num_procs > 1:
+        gol_games = [None] * len(initial_states)
+        for i, gol_game in get_pool(num_procs).imap_unordered(initial_states, T=T, wrap=wrap, max_period=max_period,
+                                                              rule=rule):
+            gol_games[i] = gol_game
+        return gol_games
+    initial_states = _boards(initial_states)
+    groups = defaultdict(list)
+    for i, initial_state in enumerate(initial_states):
+        groups[initial_state.state.shape].append(i)
+    gol_games = [None] * len(initial_states)
+    for indices in groups.values():
+        boards = np.stack([initial_states[i].state for i in indices]).astype(bool)
+        group_rule = _group_rule(rule, indices)
+        if max_period is not None:
+            frames, transients, periods = simulate_batch_until_cycle(boards, T=T, max_period=max_period, wrap=wrap,
+                                                                     rule=group_rule)
+            for j, i in enumerate(indices):
+                stop = len(frames) if periods[j] is None else transients[j] + periods[j]
+                trajectory = [GOLState(frame) for frame in frames[:stop, j]]
+                gol_games[i] = PeriodicGOLGame(trajectory, T, transients[j], periods[j])
+            continue
+        frames = simulate_batch(boards, T=T, wrap=wrap, rule=group_rule)
+        for j, i in enumerate(indices):
+            gol_games[i] = GOLGame([GOLState(frame) for frame in frames[:, j]])
     return gol_games
 
 
+class StreamingBatch:
+    """
+    One same-shaped group of batched_run_gol_streaming: the boards still stepping, every board's
+    accumulators and the generation reached. It holds only arrays and measurements, so a run can be
+    pickled part way through and resumed with advance().
+    """
+
+    def __init__(self, boards: np.array, accumulators: List[Dict[str, StreamingMeasurement]], T: int = 1000,
+                 wrap: bool = False, table: np.array = None):
+        """
+        + boards: (N, H, W) initial boards, one accumulator dict per board
+        + table: compiled rule as from rules.compile_rule
+        """
+        self.boards = boards
+        self.accumulators = accumulators
+        self.T = T
+        self.wrap = wrap
+        self.table = table
+        self.generation = 0
+        self.active = list(range(len(accumulators)))  # positions in accumulators of the boards still stepping
+        for board, accs in zip(boards, accumulators):
+            for m in accs.values():
+                m.init(board)
+
+    def _prune(self) -> bool:
+        # drop the boards whose measurements are all done; False once none are left
+        keep = [k for k, j in enumerate(self.active) if not all(m.done for m in self.accumulators[j].values())]
+        if len(keep) < len(self.active):
+            self.active, self.boards = [self.active[k] for k in keep], self.boards[keep]
+            if self.table is not None and self.table.ndim == 2:
+                self.table = self.table[keep]
+        return bool(keep)
+
+    @property
+    def done(self) -> bool:
+        return self.generation >= self.T or not self._prune()
+
+    def advance(self, generations: int = None) -> bool:
+        """
+        Steps at most `generations` more generations, or to the end when None.
+        return: True once the batch is finished
+        """
+        stop = self.T if generations is None else min(self.T, self.generation + generations)
+        while self.generation < stop and self._prune():
+            self.boards = step(self.boards, wrap=self.wrap, rule=self.table)
+            for board, j in zip(self.boards, self.active):
+                # a board keeps stepping for its unfinished measurements; finished ones are left alone
+                for m in self.accumulators[j].values():
+                    if not m.done:
+                        m.update(board)
+            self.generation += 1
+        return self.done
+
+    def results(self) -> List[Dict[str, Any]]:
+        return [{name: m.finalize() for name, m in accs.items()} for accs in self.accumulators]
+
+
+def batched_run_gol_streaming(initial_states: List[Union[GOLState, SoupSpec]],
+                              measurements: Union[Dict[str, StreamingMeasurement], List[Dict[str, StreamingMeasurement]]],
+                              T=1000, wrap=False, rule=None) -> List[Dict[str, Any]]:
+    """
+    Advances boards as in batched_run_gol but pushes every frame into a fresh copy of measurements
+    for each board and then discards it, so memory does not grow with T.
+    A board stops stepping once all its measurements are done.
+    + measurements: template copied for every board, or a list with one dict per board
+    + rule: one rule for every board or a list of one rule per initial state, as in batched_run_gol
+    return: one {name: finalized value} dict per initial state, in input order
+    """
+    initial_states = _boards(initial_states)
+    groups = defaultdict(list)
+    for i, initial_state in enumerate(initial_states):
+        groups[initial_state.state.shape].append(i)
+    results = [None] * len(initial_states)
+    for indices in groups.values():
+        boards = np.stack([initial_states[i].state for i in indices]).astype(bool)
+        table = compile_rule(_group_rule(rule, indices))
+        if isinstance(measurements, dict):
+            accumulators = [copy.deepcopy(measurements) for _ in indices]
+        else:
+            accumulators = [measurements[i] for i in indices]
+        batch = StreamingBatch(boards, accumulators, T=T, wrap=wrap, table=table)
+        batch.advance()
+        for i, result in zip(indices, batch.results()):
+            results[i] = result
+    return results
+
+
+def run_gol_streaming(initial_state: GOLState, measurements: Dict[str, StreamingMeasurement],
+                      T=1000, wrap=False, rule=None) -> Dict[str, Any]:
+    """
+    Single-board batched_run_gol_streaming.
+    """
+    return batched_run_gol_streaming([initial_state], measurements, T=T, wrap=wrap, rule=rule)[0]
+
+
 if __name__ == "__main__":
     p = [0.3, 0.7]
     initial_state = GOLState.random_init(p=p)
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from gol import GOLState
+
+
+######## Seeded Random Soups ########
+
+@dataclass(frozen=True)
+class SoupSpec:
+    """
+    Everything needed to regenerate one random board: the experiment seed, the trial's index
+    among the seeds spawned from it, the board shape and the density of live cells.
+    A spec is a few bytes, so it can stand in for its board when fanned out or archived.
+    """
+    seed: Union[int, Tuple[int, ...]]
+    index: int = 0
+    height: int = 100
+    width: int = 100
+    density: float = 0.5
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.height, self.width)
+
+    def generator(self) -> np.random.Generator:
+        # the same stream as child `index` of np.random.SeedSequence(seed).spawn(...)
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(self.index,)))
+
+    def board(self) -> np.array:
+        return random_boards(self.generator(), (self.height, self.width), self.density)
+
+    def to_state(self) -> GOLState:
+        return GOLState(self.board())
+
+
+def random_boards(rng: np.random.Generator, shape: tuple, density: float = 0.5) -> np.array:
+    """
+    return: bool array of the given shape (a board or an (N, H, W) batch), each cell alive with probability density
+    """
+    return rng.random(shape, dtype=np.float32) < density
+
+
+def spawn_soups(seed: Union[int, Tuple[int, ...]], n: int, height: int = 100, width: int = 100,
+                density: float = 0.5, start: int = 0) -> List[SoupSpec]:
+    """
+    return: specs of trials start .. start+n-1 under seed; each trial has its own independent stream
+    """
+    return [SoupSpec(seed, i, height, width, density) for i in range(start, start + n)]
+
+
+def soup_batch(specs: List[SoupSpec]) -> np.array:
+    """
+    return: (N, H, W) bool array holding the board of every spec; all specs must share one shape
+    """
+    out = np.empty((len(specs),) + specs[0].shape, dtype=bool)
+    for board, spec in zip(out, specs):
+        board[:] = spec.board()
+    return out
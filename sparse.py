@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Tuple, Optional
+
+import numpy as np
+
+from gol import GOLState
+from rules import Rule, CONWAY, get_rule
+
+
+######## Sparse Live-cell Engine ########
+
+OFFSETS = np.array([(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx], dtype=np.int64)
+
+
+def _encode(cells: np.array, origin: np.array, span: int) -> np.array:
+    return (cells[:, 0] - origin[0]) * span + (cells[:, 1] - origin[1])
+
+
+def step_cells(cells: np.array, bounds: Optional[Tuple[int, int]] = None, rule: Rule = None) -> np.array:
+    """
+    Advances a set of live cells by one generation.
+    Only the live cells and their neighbors are touched, so rules with B0 are not supported.
+    + cells: int64 array of shape (n, 2) holding unique (row, col) coordinates
+    + bounds: (height, width) of a bounded board, or None for the unbounded plane
+    + rule: B/S rule string or rules.Rule, defaults to B3/S23
+    return: sorted int64 array of shape (m, 2) of live cells in the next generation
+    """
+    rule = get_rule(rule)
+    if 0 in rule.birth:
+        raise ValueError(f"the sparse engine cannot run B0 rules: {rule}")
+    if len(cells) == 0:
+        return cells
+    neighbors = (cells[:, None, :] + OFFSETS[None]).reshape(-1, 2)
+    if bounds is not None:
+        inside = (neighbors[:, 0] >= 0) & (neighbors[:, 0] < bounds[0]) & \
+                 (neighbors[:, 1] >= 0) & (neighbors[:, 1] < bounds[1])
+        neighbors = neighbors[inside]
+    # pack coordinates into one integer key so counting is a single np.unique
+    origin = cells.min(axis=0) - 1
+    span = int(cells[:, 1].max() - origin[1]) + 2
+    keys, counts = np.unique(_encode(neighbors, origin, span), return_counts=True)
+    alive = np.isin(keys, _encode(cells, origin, span))
+    if rule == CONWAY:
+        keys = keys[(counts == 3) | (alive & (counts == 2))]
+    else:
+        survivors = keys[rule.table[alive.astype(np.uint8), counts]]
+        if 0 in rule.survival:
+            # live cells without live neighbors have no entry in keys
+            own = _encode(cells, origin, span)
+            survivors = np.union1d(survivors, own[~np.isin(own, keys)])
+        keys = survivors
+    return np.stack((keys // span + origin[0], keys % span + origin[1]), axis=1)
+
+
+@dataclass
+class SparseGOLState:
+    cells: np.array  # int64 array of shape (n, 2) of live (row, col) coordinates
+    bounds: Optional[Tuple[int, int]] = None  # (height, width) if bounded, None for the unbounded plane
+
+    @classmethod
+    def from_state(cls, gol_state: GOLState, bounded: bool = False, top: int = 0, left: int = 0):
+        """
+        + bounded: keep the board's edges, otherwise the board is placed on the unbounded plane
+        + top, left: plane coordinate of the board's upper left corner
+        """
+        rows, cols = gol_state.state.nonzero()
+        cells = np.stack((rows + top, cols + left), axis=1).astype(np.int64)
+        return cls(cells, gol_state.state.shape if bounded else None)
+
+    def to_state(self, height: int = None, width: int = None, top: int = 0, left: int = 0) -> GOLState:
+        """
+        Materializes the height x width window whose upper left corner is at (top, left).
+        Defaults to the whole board when bounded.
+        """
+        if height is None or width is None:
+            height, width = self.bounds
+        out = np.zeros((height, width), dtype=bool)
+        rows, cols = self.cells[:, 0] - top, self.cells[:, 1] - left
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        out[rows[inside], cols[inside]] = True
+        return GOLState(out)
+
+    def step(self, rule: Rule = None):
+        return SparseGOLState(step_cells(self.cells, self.bounds, rule=rule), self.bounds)
+
+    def population(self) -> int:
+        return len(self.cells)
+
+    def bounding_box(self) -> np.array:
+        """
+        return: np.array of size (2, 2) as in measurements.BoundingBox, ((min x, min y), (max x, max y))
+        """
+        if len(self.cells) == 0:
+            return np.array([[0, 0], [0, 0]])
+        (ymin, xmin), (ymax, xmax) = self.cells.min(axis=0), self.cells.max(axis=0)
+        return np.array(((xmin, ymin), (xmax, ymax)))
+
+    def _sorted(self):
+        return self.cells[np.lexsort((self.cells[:, 1], self.cells[:, 0]))]
+
+    def __eq__(self, other):
+        if not isinstance(other, SparseGOLState):
+            return NotImplemented
+        return self.bounds == other.bounds and np.array_equal(self._sorted(), other._sorted())
+
+    def __hash__(self):
+        return hash((self.bounds, self._sorted().tobytes()))
+
+
+def simulate_sparse(initial_state: GOLState, T: int = 1000, bounded: bool = False, rule: Rule = None) -> list:
+    """
+    Runs T generations on the live-cell set.
+    return: list of T+1 SparseGOLStates, starting with the initial state
+    """
+    rule = get_rule(rule)
+    frame = SparseGOLState.from_state(initial_state, bounded=bounded)
+    trajectory = [frame]
+    for _ in range(T):
+        frame = frame.step(rule=rule)
+        trajectory.append(frame)
+    return trajectory
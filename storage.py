@@ -0,0 +1,302 @@
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+from gol import GOLState, GOLGame, OnDemandGOLGame, StreamingMeasurement
+from engine import CycleWindow
+from packed import pack, unpack, WORD_BITS
+
+
+######## Binary Trajectory Format ########
+
+# A .golt file is a fixed 128 byte header followed by frames of bit-packed rows
+# (little-endian uint64 words, see packed.pack), one frame after another.
+MAGIC = b"GOLTRAJ\x00"
+VERSION = 1
+HEADER_SIZE = 128
+_HEADER = struct.Struct("<8sIIIQQ64s")  # magic, version, height, width, start generation, num frames, rule
+
+
+@dataclass
+class TrajectoryHeader:
+    height: int
+    width: int
+    rule: str = "B3/S23"
+    start_generation: int = 0  # generation index of the first frame
+    num_frames: int = 0
+
+    @property
+    def words_per_row(self) -> int:
+        return (self.width + WORD_BITS - 1) // WORD_BITS
+
+    @property
+    def frame_shape(self) -> tuple:
+        return (self.height, self.words_per_row)
+
+    def to_bytes(self) -> bytes:
+        packed = _HEADER.pack(MAGIC, VERSION, self.height, self.width, self.start_generation,
+                              self.num_frames, self.rule.encode())
+        return packed.ljust(HEADER_SIZE, b"\x00")
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        magic, version, height, width, start_generation, num_frames, rule = _HEADER.unpack(data[:_HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version 1 GOL trajectory file")
+        return cls(height, width, rule.rstrip(b"\x00").decode(), start_generation, num_frames)
+
+
+class TrajectoryWriter:
+    """
+    Appends frames to a trajectory file one at a time; the frame count in the header
+    is updated on close, so a trajectory of any length is written in constant memory.
+    """
+
+    def __init__(self, path: str, height: int, width: int, rule: str = "B3/S23", start_generation: int = 0):
+        self.path = path
+        self.header = TrajectoryHeader(height, width, rule, start_generation)
+        self._file = open(path, "wb")
+        self._file.write(self.header.to_bytes())
+
+    def write(self, frame: np.array):
+        """
+        + frame: (height, width) bool array, or (n, height, width) for several frames at once
+        """
+        frames = frame.reshape((-1,) + frame.shape[-2:])
+        assert frames.shape[1:] == (self.header.height, self.header.width)
+        self._file.write(pack(frames).astype("<u8", copy=False).tobytes())
+        self.header.num_frames += len(frames)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self.header.to_bytes())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemmapGOLGame(OnDemandGOLGame):
+    """
+    A GOLGame read from a trajectory file through np.memmap; a frame is only read
+    from disk and unpacked when it is accessed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.header = TrajectoryHeader.from_bytes(f.read(HEADER_SIZE))
+        self.path = path
+        shape = (self.header.num_frames,) + self.header.frame_shape
+        self.words = np.memmap(path, dtype="<u8", mode="r", offset=HEADER_SIZE, shape=shape) \
+            if self.header.num_frames else np.zeros(shape, dtype="<u8")
+
+    def __len__(self):
+        return self.header.num_frames
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            frames = unpack(self.words[index], self.header.width)
+            return GOLGame([GOLState(frame) for frame in frames])
+        return GOLState(unpack(self.words[index], self.header.width))
+
+
+def save_game(game: GOLGame, path: str, rule: str = "B3/S23", start_generation: int = 0):
+    """
+    Streams every frame of game into a trajectory file.
+    """
+    frames = iter(game)
+    first = next(frames).state
+    with TrajectoryWriter(path, *first.shape, rule=rule, start_generation=start_generation) as writer:
+        writer.write(first)
+        for frame in frames:
+            writer.write(frame.state)
+
+
+def load_game(path: str) -> MemmapGOLGame:
+    return MemmapGOLGame(path)
+
+
+@dataclass
+class TrajectoryRecorder(StreamingMeasurement):
+    """
+    Streams every frame pushed by the engine (see run_gol.batched_run_gol_streaming) into a trajectory file.
+    """
+    name = "trajectory_file"
+    description = "Path of the trajectory file holding every frame."
+    path: str
+    rule: str = "B3/S23"
+
+    def init(self, frame: np.array):
+        self.writer = TrajectoryWriter(self.path, *frame.shape, rule=self.rule)
+        self.writer.write(frame)
+
+    def update(self, frame: np.array):
+        self.writer.write(frame)
+
+    def finalize(self) -> str:
+        self.writer.close()
+        return self.path
+
+
+######## Delta/Keyframe Trajectories ########
+
+class DeltaGOLGame(OnDemandGOLGame):
+    """
+    A GOLGame stored as a keyframe every keyframe_interval frames plus, for every frame, the flat
+    indices of the cells that flipped since the previous frame (a sparse XOR delta).
+    Random access seeks to the closest keyframe and replays deltas. Once a frame repeats one of
+    the previous max_period frames the cycle is stored once and later frames index into it.
+    """
+
+    def __init__(self, height: int, width: int, keyframe_interval: int = 100, max_period: int = 32):
+        self.height, self.width = height, width
+        self.keyframe_interval = keyframe_interval
+        self.max_period = max_period
+        self.keyframes = {}  # frame index -> packed words
+        self.deltas = []  # deltas[i]: int32 flat indices flipped between frame i-1 and i (empty for i = 0)
+        self.num_frames = 0
+        self.transient = None
+        self.period = None
+        self._last = None
+        self._window = CycleWindow(max_period, stored=self._stored_frame)
+
+    @classmethod
+    def from_game(cls, game: GOLGame, keyframe_interval: int = 100, max_period: int = 32):
+        frames = iter(game)
+        first = next(frames).state
+        delta_game = cls(*first.shape, keyframe_interval=keyframe_interval, max_period=max_period)
+        delta_game.append(first)
+        for frame in frames:
+            delta_game.append(frame.state)
+        return delta_game
+
+    @property
+    def num_stored(self) -> int:
+        return len(self.deltas)
+
+    def append(self, frame: np.array):
+        self.num_frames += 1
+        if self.period is not None:
+            return
+        t = len(self.deltas)
+        seen = self._window.push(frame)
+        if seen is not None:
+            self.transient, self.period = seen, t - seen
+            self._last = self._window = None
+            return
+        if t == 0:
+            self.deltas.append(np.zeros(0, dtype=np.int32))
+        else:
+            self.deltas.append(np.flatnonzero(self._last != frame).astype(np.int32))
+        if t % self.keyframe_interval == 0:
+            self.keyframes[t] = pack(frame)
+        self._last = frame.copy()
+
+    def _stored_frame(self, i: int) -> np.array:
+        return self[i].state
+
+    def extend_to(self, num_frames: int):
+        """
+        Declares the trajectory num_frames long; only valid once a cycle has been stored.
+        """
+        assert self.period is not None
+        self.num_frames = max(self.num_frames, num_frames)
+
+    def __len__(self):
+        return self.num_frames
+
+    def _frames(self, start: int):
+        # yields stored frames start, start+1, ... replaying deltas from the keyframe before start
+        k = start - start % self.keyframe_interval
+        frame = unpack(self.keyframes[k], self.width).reshape(-1)
+        for i in range(k, self.num_stored):
+            if i > k:
+                frame[self.deltas[i]] ^= True
+            if i >= start:
+                yield frame.reshape(self.height, self.width).copy()
+
+    def __iter__(self):
+        cycle = []
+        for i, frame in enumerate(self._frames(0)):
+            if self.period is not None and i >= self.transient:
+                cycle.append(frame)
+            yield GOLState(frame)
+        for i in range(self.num_stored, len(self)):
+            yield GOLState(cycle[(i - self.transient) % self.period])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return GOLGame([self[i] for i in range(*index.indices(len(self)))])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        return GOLState(next(self._frames(self._stored_index(index))))
+
+    def save(self, path: str):
+        """
+        Writes the keyframes, deltas and cycle to a compressed .npz archive.
+        """
+        key_index = np.array(sorted(self.keyframes), dtype=np.int64)
+        offsets = np.cumsum([0] + [len(d) for d in self.deltas]).astype(np.int64)
+        np.savez_compressed(
+            path,
+            meta=np.array([self.height, self.width, self.keyframe_interval,
+                           -1 if self.max_period is None else self.max_period, self.num_frames,
+                           -1 if self.transient is None else self.transient,
+                           -1 if self.period is None else self.period], dtype=np.int64),
+            key_index=key_index,
+            keyframes=np.stack([self.keyframes[i] for i in key_index]) if len(key_index) else np.zeros(0, np.uint64),
+            delta_offsets=offsets,
+            delta_cells=np.concatenate(self.deltas) if self.deltas else np.zeros(0, np.int32),
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        data = np.load(path)
+        height, width, interval, max_period, num_frames, transient, period = data["meta"].tolist()
+        game = cls(height, width, keyframe_interval=interval, max_period=None if max_period < 0 else max_period)
+        game.keyframes = {int(i): words for i, words in zip(data["key_index"], data["keyframes"])}
+        offsets, cells = data["delta_offsets"], data["delta_cells"]
+        game.deltas = [cells[offsets[i]:offsets[i+1]] for i in range(len(offsets) - 1)]
+        game.num_frames = num_frames
+        game.transient = None if transient < 0 else transient
+        game.period = None if period < 0 else period
+        return game
+
+
+@dataclass
+class DeltaRecorder(StreamingMeasurement):
+    """
+    Streams engine frames into a DeltaGOLGame. With T set it is done once a cycle is
+    stored, since the remaining frames up to T follow from the cycle.
+    """
+    name = "delta_trajectory"
+    description = "Keyframe/delta compressed trajectory."
+    T: int = None
+    keyframe_interval: int = 100
+    max_period: int = 32
+
+    def init(self, frame: np.array):
+        self.game = DeltaGOLGame(*frame.shape, keyframe_interval=self.keyframe_interval, max_period=self.max_period)
+        self.game.append(frame)
+
+    def update(self, frame: np.array):
+        if self.done:
+            return
+        self.game.append(frame)
+        if self.T is not None and self.game.period is not None:
+            self.game.extend_to(self.T + 1)
+            self.done = True
+
+    def finalize(self) -> DeltaGOLGame:
+        return self.game
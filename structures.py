@@ -4,8 +4,9 @@ from typing import List, Tuple, Union
 import numpy as np
 
 from gol import GOLState, GOLStructure, GOLObject, GOLState
-from measurements import LongTimeVelocity, BoundingBox
+from measurements import LongTimeVelocity, BoundingBox, measure
 from run_gol import run_gol
+from rle import parse_rle
 
 
 @dataclass
@@ -14,15 +15,52 @@ class Glider(GOLStructure):
     description = "5 cell glider with fixed velocity"
     measurements = {
                      "bounding_box": BoundingBox(time_range=100), 
-                     "long_time_velocity": LongTimeVelocity(time_range=100),
+                     "long_time_velocity": LongTimeVelocity(time_range=97),  # 96 steps: a whole number of periods
                    }
     def __init__(self, object):
         self.object = object
 
+    def check(self, gol_game) -> bool:
+        results = measure(gol_game, self.measurements)
+        bboxes = results["bounding_box"]
+        steps = self.measurements["long_time_velocity"].time_range - 1
+        velocity = results["long_time_velocity"] / steps
+        # every phase fits a 3x3 box and each corner moves one cell diagonally per 4 steps
+        return np.array([box[1][0] - box[0][0] == 2 and box[1][1] - box[0][1] == 2 for box in bboxes]).all() \
+            and np.abs(np.sqrt(2) / 4 - velocity) < 1e-3
+
+    def expected_measurements(self) -> bool:
+        gol_game = run_gol(GOLState.from_object(self.object), T=self.horizon() - 1)
+        return self.check(gol_game)
+
+
+class KnownStructure(GOLStructure):
+    """
+    A pattern from the catalogue in patterns.py. Periodic patterns must return to their
+    own shape after `period` generations, moved by the catalogued displacement.
+    """
+
+    def __init__(self, info, object: GOLObject):
+        self.info = info
+        self.name = info.name
+        self.description = f"{info.kind.replace('_', ' ')} from the pattern catalogue"
+        self.object = object
+        horizon = (info.period or 0) + 1
+        self.measurements = {"bounding_box": BoundingBox(time_range=horizon)}
+
+    def check(self, gol_game) -> bool:
+        if self.info.period is None:
+            return True
+        bboxes = measure(gol_game, self.measurements)["bounding_box"]
+        first, last = gol_game[0].state, gol_game[self.info.period].state
+        (x0, y0), (x1, y1) = bboxes[0]
+        (u0, v0), (u1, v1) = bboxes[-1]
+        same_shape = np.array_equal(first[y0:y1+1, x0:x1+1], last[v0:v1+1, u0:u1+1])
+        return same_shape and (v0 - y0, u0 - x0) == tuple(self.info.displacement)
+
     def expected_measurements(self) -> bool:
-        gol_game = run_gol(GOLState.from_object(self.object))
-        bboxes = self.measurements["bounding_box"](gol_game)
-        print(bboxes)
-        velocity = self.measurements["long_time_velocity"](gol_game)
-        print(velocity)
-        return np.array([box[1][0] - box[0][0] == 3 and box[1][1] - box[0][1] == 3 for box in bboxes]).all() and np.abs(1/4, velocity) < 1e-3
\ No newline at end of file
+        cells, _ = parse_rle(self.object.rle)
+        margin = (self.info.period or 0) + 2
+        height, width = cells.shape[0] + 2 * margin, cells.shape[1] + 2 * margin
+        state = GOLState.from_object(GOLObject(x=margin, y=margin, rle=self.object.rle), height=height, width=width)
+        return self.check(run_gol(state, T=self.info.period or 0))
@@ -0,0 +1,122 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Union
+
+import numpy as np
+
+from gol import GOLState, StreamingMeasurement
+from rules import compile_rule
+from run_gol import StreamingBatch
+from soups import SoupSpec
+
+
+######## Checkpointed Sweeps ########
+
+def _to_json(value):
+    # finalized measurements often hold numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"cannot store {type(value).__name__} in a sweep store")
+
+
+class SweepStore:
+    """
+    Local store of a sweep's progress:
+    results.jsonl, an append-only log with one {"trial": key, "result": ...} line per finished trial,
+    and state/, pickled snapshots of the batches still running, each replaced atomically.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.results_path = os.path.join(directory, "results.jsonl")
+        os.makedirs(os.path.join(directory, "state"), exist_ok=True)
+
+    def completed(self) -> Dict[str, Any]:
+        """
+        return: {trial key: result} of every trial recorded so far; a torn last line from a crash is ignored
+        """
+        results = {}
+        if not os.path.exists(self.results_path):
+            return results
+        with open(self.results_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[entry["trial"]] = entry["result"]
+        return results
+
+    def record(self, results: Dict[str, Any]):
+        """
+        Appends finished trials and syncs them to disk.
+        """
+        with open(self.results_path, "a") as f:
+            for key, result in results.items():
+                f.write(json.dumps({"trial": key, "result": result}, default=_to_json) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _state_path(self, key: str) -> str:
+        return os.path.join(self.directory, "state", hashlib.sha1(key.encode()).hexdigest() + ".pkl")
+
+    def save_state(self, key: str, state: Any):
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.join(self.directory, "state"))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._state_path(key))
+
+    def load_state(self, key: str) -> Any:
+        path = self._state_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def drop_state(self, key: str):
+        path = self._state_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_sweep(trials: Dict[str, Union[GOLState, SoupSpec]], measurements: Dict[str, StreamingMeasurement],
+              T: int = 1000, wrap: bool = False, rule=None, store: SweepStore = None, batch_size: int = 100,
+              checkpoint_every: int = 500) -> Dict[str, Dict[str, Any]]:
+    """
+    Streams measurements over every trial as batched_run_gol_streaming does, batch_size boards at a time.
+    With a store, finished trials are appended to it and a running batch is snapshotted every
+    checkpoint_every generations. A rerun with the same trials skips the recorded trials and
+    resumes an interrupted batch from its last snapshot.
+    + trials: {trial key: board or SoupSpec}; keys must be unique strings, and all boards one shape
+    return: {trial key: {name: finalized value}} for every trial, in the order of trials;
+    values go through JSON (numpy scalars become Python numbers, arrays become lists) with or without a store
+    """
+    done = store.completed() if store is not None else {}
+    pending = [key for key in trials if key not in done]
+    for start in range(0, len(pending), batch_size):
+        keys = pending[start:start + batch_size]
+        # a batch is named by its trials, so a rerun forms the same batch and finds its snapshot
+        batch_key = "\n".join(keys)
+        batch = store.load_state(batch_key) if store is not None else None
+        if batch is None:
+            boards = np.stack([trials[key].board() if isinstance(trials[key], SoupSpec) else trials[key].state
+                               for key in keys]).astype(bool)
+            batch = StreamingBatch(boards, [copy.deepcopy(measurements) for _ in keys], T=T, wrap=wrap,
+                                   table=compile_rule(rule))
+        while not batch.advance(checkpoint_every if store is not None else None):
+            store.save_state(batch_key, batch)
+        # results are always returned in JSON form, as recorded results read back from a store are
+        results = json.loads(json.dumps(dict(zip(keys, batch.results())), default=_to_json))
+        if store is not None:
+            store.record(results)
+            store.drop_state(batch_key)
+        done.update(results)
+    return {key: done[key] for key in trials}
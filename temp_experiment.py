@@ -4,7 +4,11 @@ import json
 from tqdm import tqdm
 
 from run_gol import run_gol, batched_run_gol
-from gol import GOLState, GOLGame
+from measurements import StillLifeDetector, OscillatorDetector
+from census import StructureCensus
+from gol import GOLState, GOLGame, PeriodicGOLGame
+from soups import spawn_soups
+from sweep import SweepStore, run_sweep
 
 
 def compute_entropy(grid):
@@ -35,24 +39,26 @@ def compute_entropy(grid):
 
 
 def detect_still_life(gol_game: GOLGame):
+    if isinstance(gol_game, PeriodicGOLGame) and gol_game.period is not None:
+        return gol_game.period == 1
     # Assuming grid is a 2D numpy array
     prev_state = None
     is_still = False
     for gol_state in gol_game:
-        if prev_state is None:
-            prev_state = gol_state
-        else:
+        if prev_state is not None:
             is_still = is_still or (prev_state == gol_state)
+        prev_state = gol_state
     return is_still
 
 
 def detect_oscillators(gol_game: GOLGame):
+    if isinstance(gol_game, PeriodicGOLGame) and gol_game.period is not None:
+        return True
     seen_states = set()
     is_oscillator = False
     for i, state in enumerate(gol_game):
-        state_hash = hash(str(state))
-        is_oscillator = is_oscillator or (state_hash in seen_states)
-        seen_states.add(state_hash)
+        is_oscillator = is_oscillator or (state in seen_states)
+        seen_states.add(state)
     return is_oscillator
 
 
@@ -63,23 +69,38 @@ def get_stats(gol_game):
            }
 
 
-def run_experiment():
+# streaming equivalents of get_stats, fed frame by frame by the engine; the census's cycle
+# detector is the only frame window kept per board, and the other statistics read its period
+_census = StructureCensus(max_period=32)  # counts per kind of object in the final frame
+STATS = {
+    "is_still": StillLifeDetector(cycle=_census),
+    "is_oscillator": OscillatorDetector(cycle=_census),
+    "census": _census,
+}
+
+
+def run_experiment(seed=0, checkpoint_dir=None):
     # run experiment to compare complexity vs. initial entropy levels
+    # every trial's board is regenerated from (seed, density index, trial index) alone
+    # with checkpoint_dir, finished trials and running batches are saved there and a rerun resumes
     num_trials = 500
     batch_size = 100
     horizon = 5000
-    num_batches = (num_trials + batch_size - 1) // batch_size
     init_ps = [0.1 * i for i in range(1, 10)]  # prob. of any cell starting with life
+    store = SweepStore(checkpoint_dir) if checkpoint_dir is not None else None
     exp_stats = dict()
-    for init_p in init_ps:
+    for arm, init_p in enumerate(tqdm(init_ps)):
         trials_stats = defaultdict(list)
-        # dispatching multiple batches to avoid accumulating GOLGames in memory
-        for _ in tqdm(range(num_batches)):
-            init_states = [GOLState.random_init(p=[1-init_p, init_p]) for i in range(batch_size)]
-            gol_games = batched_run_gol(init_states, T=horizon)
-            for gol_game in gol_games:
-                trial_stats = get_stats(gol_game)
-                for k, v in trial_stats.items():
+        # frames are streamed into the STATS accumulators and never stored;
+        # each board stops stepping once it has entered a cycle
+        soups = spawn_soups((seed, arm), num_trials, density=init_p)
+        trials = {f"{seed}/{arm}/{soup.index}": soup for soup in soups}
+        for trial_stats in run_sweep(trials, STATS, T=horizon, store=store, batch_size=batch_size).values():
+            for k, v in trial_stats.items():
+                if isinstance(v, dict):
+                    for kind, n in v.items():
+                        trials_stats[f"{k}/{kind}"].append(n)
+                else:
                     trials_stats[k].append(v)
         # average results over trials
         for k, v in trials_stats.items():
@@ -1,9 +1,35 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 import numpy as np
 
 from temp_experiment import compute_entropy
 from gol import GOLState, GOLGame, GOLStructure, GOLObject
 from structures import Glider
+from run_gol import run_gol, batched_run_gol
+from packed import PackedGOLState, simulate_packed
+from hashlife import HashLifeUniverse
+from sparse import simulate_sparse
+from engine import CycleWindow
+from measurements import BoundingBox, PerStepVelocity, LongTimeVelocity, measure
+from measurements import MeanPopulation, ChangeFromInitial, StillLifeDetector, OscillatorDetector, StreamingBoundingBox
+from run_gol import batched_run_gol_streaming, run_gol_streaming
+from temp_experiment import get_stats
+from rle import parse_rle, encode_rle
+from patterns import identify, default_index
+from census import census, count, batched_census, label_components, StructureCensus
+from verify import verify_structures
+from storage import save_game, load_game, TrajectoryRecorder, DeltaGOLGame, DeltaRecorder
+from rules import Rule
+from tiled import TiledSimulator, simulate_tiled
+from cache import ResultCache, default_cache
+from soups import SoupSpec, spawn_soups, soup_batch
+from experiment import AdaptiveTrials, Arm, IndependentVariable, Hypothesis
+from fused import DeclarativeExperiment, execute, run_arms
+from sweep import SweepStore, run_sweep
+from pool import get_pool
+from measurements import FinalPopulation, CycleDetector
 
 class TestMathFunctions(unittest.TestCase):
 
@@ -42,6 +68,345 @@ class TestMathFunctions(unittest.TestCase):
         assert glider.expected_measurements()
 
 
+    def test_run_gol(self):
+        # blinker has period 2 on a bounded board
+        blinker = GOLState.from_object(GOLObject(x=1, y=1, rle="3o!"), height=5, width=5)
+        game = run_gol(blinker, T=4)
+        assert len(game) == 5
+        assert game.trajectory[2] == blinker and not game.trajectory[1] == blinker
+        # glider crosses an 8x8 torus and returns after 32 generations
+        glider = GOLState.from_object(GOLObject(x=0, y=0, rle="bob$2bo$3o!"), height=8, width=8)
+        game = run_gol(glider, T=32, wrap=True)
+        assert game.trajectory[-1] == glider and game.trajectory[4].state.sum() == 5
+
+    def test_batched_run_gol(self):
+        states = [GOLState.random_init(height=20, width=30) for _ in range(3)] + [GOLState.random_init(height=10, width=10)]
+        games = batched_run_gol(states, T=20)
+        for state, game in zip(states, games):
+            single = run_gol(state, T=20)
+            assert len(game) == 21
+            assert all(a == b for a, b in zip(game.trajectory, single.trajectory))
+
+    def test_packed(self):
+        for wrap in (False, True):
+            state = GOLState.random_init(height=20, width=70)
+            dense = run_gol(state, T=30, wrap=wrap)
+            packed = simulate_packed(state, T=30, wrap=wrap)
+            assert all(a == b.to_state() for a, b in zip(dense.trajectory, packed))
+            assert all(a == b for a, b in zip(dense, run_gol(state, T=30, wrap=wrap, engine="packed")))
+        assert PackedGOLState.from_state(state) == PackedGOLState.from_state(GOLState(state.state.copy()))
+        assert len({PackedGOLState.from_state(state), PackedGOLState.from_state(state)}) == 1
+
+    def test_hashlife(self):
+        board = np.zeros((64, 64), dtype=bool)
+        board[28:36, 28:36] = GOLState.random_init(height=8, width=8).state
+        universe = HashLifeUniverse.from_state(GOLState(board))
+        game = run_gol(GOLState(board), T=13)
+        for T in (1, 4, 13):
+            assert universe.advance(T).to_state(64, 64) == game.trajectory[T]
+        # r-pentomino stabilizes to 116 cells at generation 1103
+        r_pentomino = HashLifeUniverse.from_object(GOLObject(x=0, y=0, rle="b2o$2o$bo!"))
+        assert r_pentomino.advance(5000).population() == 116
+
+    def test_sparse(self):
+        state = GOLState.random_init(height=20, width=30)
+        dense = run_gol(state, T=20)
+        sparse = simulate_sparse(state, T=20, bounded=True)
+        assert all(a == b.to_state() for a, b in zip(dense.trajectory, sparse))
+        # on the unbounded plane a glider keeps moving past where the board edge would be
+        glider = GOLState.from_object(GOLObject(x=0, y=0, rle="bob$2bo$3o!"), height=3, width=3)
+        final = simulate_sparse(glider, T=40)[-1]
+        assert final.population() == 5 and (final.bounding_box() == [[10, 10], [12, 12]]).all()
+
+    def test_lazy_game(self):
+        state = GOLState.random_init(height=20, width=20)
+        eager = run_gol(state, T=250)
+        lazy = run_gol(state, T=250, lazy=True)
+        assert len(lazy) == 251
+        assert lazy[-1] == eager[-1] and lazy[137] == eager[137] and lazy[3] == eager[3]
+        assert all(a == b for a, b in zip(lazy[10:40:3], eager.trajectory[10:40:3]))
+        assert all(a == b for a, b in zip(lazy, eager))
+        assert len(lazy._keyframes) == 3 and len(lazy._recent) <= lazy.window
+
+    def test_cycle_detection(self):
+        blinker = GOLState.from_object(GOLObject(x=2, y=1, rle="3o!"), height=5, width=5)
+        game = run_gol(blinker, T=1000, max_period=4)
+        assert (game.transient, game.period, len(game), len(game.trajectory), len(game._stored)) == (0, 2, 1001, 1001, 2)
+        assert game[999] == game[1] and game[1000] == blinker
+        states = [GOLState.random_init(height=16, width=16) for _ in range(4)]
+        for state, periodic in zip(states, batched_run_gol(states, T=300, max_period=8)):
+            eager = run_gol(state, T=300)
+            assert len(periodic) == 301 and all(a == b for a, b in zip(periodic, eager))
+        a, b, c = np.eye(3, dtype=bool), np.zeros((3, 3), dtype=bool), np.ones((3, 3), dtype=bool)
+        window = CycleWindow(max_period=2)
+        assert [window.push(frame) for frame in (a, b, c, a, c)] == [None, None, None, None, 2]
+
+    def test_state_hash(self):
+        state = GOLState.random_init(height=30, width=30)
+        copy = GOLState(state.state.copy())
+        assert state == copy and hash(state) == hash(copy) and len({state, copy}) == 1
+        assert not state == GOLState(state.state[:, :29])
+
+    def test_measurements(self):
+        game = run_gol(GOLState.random_init(height=30, width=40), T=50)
+        bbox = BoundingBox(time_range=40)
+        assert all((a == bbox.frame_bbox(frame.state)).all() for a, frame in zip(bbox(game), game))
+        results = measure(game, {"bbox": bbox, "step": PerStepVelocity(time_range=20), "long": LongTimeVelocity(time_range=30)})
+        assert len(results["bbox"]) == 40 and len(results["step"]) == 19
+        assert results["long"] == LongTimeVelocity(time_range=30)(game)
+
+    def test_streaming_measurements(self):
+        states = [GOLState.random_init(height=12, width=12) for _ in range(5)]
+        # both detectors read the period of one shared, unbounded cycle detector
+        cycle = CycleDetector(max_period=None)
+        measurements = {"cycle": cycle, "is_still": StillLifeDetector(cycle=cycle),
+                        "is_oscillator": OscillatorDetector(cycle=cycle), "bbox": StreamingBoundingBox(time_range=10)}
+        streamed = batched_run_gol_streaming(states, measurements, T=200)
+        for state, stats in zip(states, streamed):
+            game = run_gol(state, T=200)
+            assert get_stats(game) == {k: stats[k] for k in ("is_still", "is_oscillator")}
+            assert all((a == b).all() for a, b in zip(stats["bbox"], BoundingBox(time_range=10)(game)))
+            assert np.isclose(MeanPopulation()(game), np.mean([frame.state.sum() for frame in game]))
+            assert ChangeFromInitial()(game) == np.mean(game[0].state == game[-1].state)
+        # detectors paired with a measurement that is never done must keep their first answer
+        block = GOLState.from_object(GOLObject(x=4, y=4, rle="2o$2o!"), height=10, width=10)
+        stats = run_gol_streaming(block, {"cycle": CycleDetector(), "is_still": StillLifeDetector(),
+                                          "bbox": StreamingBoundingBox(time_range=5), "population": FinalPopulation()},
+                                  T=300)
+        assert stats["cycle"] == 1 and stats["is_still"] and len(stats["bbox"]) == 5 and stats["population"] == 4
+        census = StructureCensus()
+        census.init(block.state)
+        census.update(block.state)
+        assert census.done and census.window is None and census.finalize()["still_life"] == 1
+
+    def test_worker_pool(self):
+        states = [GOLState.random_init(height=16, width=16) for _ in range(6)] + [GOLState.random_init(height=8, width=70)]
+        pooled = batched_run_gol(states, T=30, num_procs=2)
+        for state, game in zip(states, pooled):
+            assert all(a == b for a, b in zip(game, run_gol(state, T=30)))
+        # interleaved calls share the pool's results queue but each gets only its own boards
+        pool = get_pool(2)
+        first = pool.imap_unordered(states[:6], T=5, chunk_size=1)
+        second = pool.imap_unordered(states[:6][::-1], T=7, chunk_size=1)
+        for (i, a), (j, b) in zip(first, second):
+            assert len(a) == 6 and a[-1] == run_gol(states[i], T=5)[-1]
+            assert len(b) == 8 and b[-1] == run_gol(states[5 - j], T=7)[-1]
+
+    def test_trajectory_file(self):
+        state = GOLState.random_init(height=10, width=70)
+        game = run_gol(state, T=20)
+        with tempfile.TemporaryDirectory() as tmp:
+            save_game(game, os.path.join(tmp, "a.golt"))
+            loaded = load_game(os.path.join(tmp, "a.golt"))
+            assert len(loaded) == 21 and loaded[13] == game[13] and loaded[-1] == game[-1]
+            assert all(a == b for a, b in zip(loaded[5:9], game[5:9]))
+            paths = [os.path.join(tmp, f"run_{i}.golt") for i in range(2)]
+            batched_run_gol_streaming([state, state], [{"file": TrajectoryRecorder(path)} for path in paths], T=20)
+            assert all(a == b for a, b in zip(load_game(paths[1]), game))
+
+    def test_delta_trajectory(self):
+        state = GOLState.random_init(height=12, width=12)
+        game = run_gol(state, T=300)
+        delta = DeltaGOLGame.from_game(game, keyframe_interval=16, max_period=8)
+        assert len(delta) == 301 and delta[-1] == game[-1] and delta[37] == game[37]
+        assert all(a == b for a, b in zip(delta, game))
+        with tempfile.TemporaryDirectory() as tmp:
+            delta.save(os.path.join(tmp, "delta.npz"))
+            loaded = DeltaGOLGame.load(os.path.join(tmp, "delta.npz"))
+            DeltaGOLGame.from_game(game, max_period=None).save(os.path.join(tmp, "unbounded.npz"))
+            unbounded = DeltaGOLGame.load(os.path.join(tmp, "unbounded.npz"))
+        assert all(a == b for a, b in zip(loaded, game))
+        assert unbounded.max_period is None and all(a == b for a, b in zip(unbounded, game))
+        streamed = batched_run_gol_streaming([state], {"game": DeltaRecorder(T=300, keyframe_interval=16)}, T=300)[0]["game"]
+        assert len(streamed) == 301 and all(a == b for a, b in zip(streamed, game))
+
+    def test_rle(self):
+        cells, header = parse_rle("#N glider\nx = 3, y = 4, rule = B3/S23\nbo$\n2bo2$3o!")
+        assert header == {"x": 3, "y": 4, "rule": "B3/S23"}
+        assert (cells == np.array([[0, 1, 0], [0, 0, 1], [0, 0, 0], [1, 1, 1]], dtype=bool)).all()
+        state = GOLState.random_init(height=23, width=81)
+        assert (parse_rle(state.to_rle())[0] == state.state).all()
+        for text in ("x = 2, y = 2\n3o$o!", "x = 2, y = 1\no$o!"):
+            with self.assertRaises(ValueError):
+                parse_rle(text)
+        glider = GOLState.from_object(GOLObject(x=2, y=3, rle="bob$2bo$3o!s"), height=8, width=8)
+        assert glider.to_object() == GOLObject(x=2, y=3, rle="bo$2bo$3o!")
+
+    def test_pattern_index(self):
+        for name, info in default_index().patterns.items():
+            cells, _ = parse_rle(info.rle)
+            for variant in (cells, np.rot90(cells), cells[::-1], np.pad(cells.T, 2)):
+                assert identify(variant).name == name
+            assert info.to_structure(x=1, y=1).expected_measurements()
+        blinker_phase = np.ones((3, 1), dtype=bool)
+        assert identify(blinker_phase).name == "blinker" and identify(np.ones((2, 3), dtype=bool)) is None
+        assert default_index().patterns["glider"].period == 4
+
+    def test_census(self):
+        board = np.zeros((30, 30), dtype=bool)
+        for x, y, rle in ((1, 1, "2o$2o!"), (10, 10, "3o!"), (20, 2, "bo$2bo$3o!"), (2, 20, "2o$obo$bo!"), (20, 20, "3o$o!")):
+            board |= GOLState.from_object(GOLObject(x=x, y=y, rle=rle), height=30, width=30).state
+        counts = count(census(board))
+        assert counts["block"] == counts["blinker"] == counts["glider"] == counts["boat"] == 1
+        assert (counts["still_life"], counts["oscillator"], counts["spaceship"], counts["other"]) == (2, 1, 1, 1)
+        labels = label_components(np.stack([board, board.T]), reach=1)
+        assert len(np.unique(labels)) == 11
+        assert [count(c) for c in batched_census(np.stack([board, board.T]))] == [counts, counts]
+        # velocity follows each glider's own orientation, not the catalogue's
+        gliders = [c for c in census(board) + census(board[:, ::-1]) if c.name == "glider"]
+        assert [c.velocity for c in gliders] == [(0.25, 0.25), (0.25, -0.25)]
+
+    def test_verify_structures(self):
+        candidates = [Glider(GOLObject(x=0, y=0, rle="bob$2bo$3o!")), Glider(GOLObject(x=0, y=0, rle="3o!")),
+                      Glider(GOLObject(x=5, y=5, rle="b3o$3o!"))]
+        candidates += [info.to_structure(x=40, y=40) for info in default_index().patterns.values()]
+        assert verify_structures(candidates, batch_size=4) == [True, False, False] + [True] * len(default_index().patterns)
+        assert verify_structures([Glider(GOLObject(x=0, y=0, rle="bo$2bo$3o!"))], height=2, width=2) == [False]
+        # a glider hanging off the board is not cropped into a different pattern
+        with self.assertRaises(ValueError):
+            GOLState.from_object(GOLObject(x=8, y=0, rle="bo$2bo$3o!"), height=10, width=10)
+        assert GOLState.from_object(GOLObject(x=7, y=7, rle="bo$2bo$3o5b!"), height=10, width=10).state.sum() == 5
+
+    def test_rules(self):
+        assert Rule.parse("b36/s23") == Rule.parse("23/36") == Rule.parse("S23/B36")
+        assert str(Rule.parse("S23/B36")) == "B36/S23"
+        state = GOLState.random_init(height=20, width=70)
+        for rule in ("B36/S23", "B2/S", "B3/S012345678"):
+            dense = run_gol(state, T=20, rule=rule)
+            packed = simulate_packed(state, T=20, rule=Rule.parse(rule))
+            sparse = simulate_sparse(state, T=20, bounded=True, rule=rule)
+            assert all(a == b.to_state() == c.to_state() for a, b, c in zip(dense, packed, sparse))
+        # a rule sweep runs as one batch with a rule per board
+        rules = ["B3/S23", "B36/S23", "B2/S"]
+        games = batched_run_gol([state] * 3, T=20, rule=rules)
+        assert all(game[-1] == run_gol(state, T=20, rule=rule)[-1] for game, rule in zip(games, rules))
+        # the highlife replicator copies itself; hashlife runs it on the unbounded plane
+        replicator = HashLifeUniverse.from_object(GOLObject(x=0, y=0, rle="2b3o$bo2bo$o3bo$o2bo$3o!"), rule="B36/S23")
+        assert replicator.advance(12).population() == 24
+        assert simulate_sparse(replicator.to_state(5, 5), T=12, rule="B36/S23")[-1].population() == 24
+
+    def test_tiled(self):
+        for wrap in (False, True):
+            state = GOLState.random_init(height=37, width=70)
+            tiled = simulate_tiled(state, T=25, wrap=wrap, num_threads=3)
+            packed = simulate_packed(state, T=25, wrap=wrap)
+            assert all(a == b for a, b in zip(tiled, packed))
+        with TiledSimulator(state, num_threads=2, num_strips=50) as simulator:
+            assert simulator.step(10).to_state() == run_gol(state, T=10)[-1]
+
+    def test_result_cache(self):
+        state, other = GOLState.random_init(height=20, width=20), GOLState.random_init(height=20, width=20)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            assert cache.run_gol(state, T=30)[-1] == run_gol(state, T=30)[-1]
+            # a shorter request is served from the longer run, duplicates in a batch are run once
+            games = cache.batched_run_gol([state, other, other], T=10)
+            assert (cache.hits, cache.misses) == (2, 2)
+            assert games[0][-1] == run_gol(state, T=10)[-1] and games[2][-1] == run_gol(other, T=10)[-1]
+            assert cache.get(state, 30, rule="B36/S23") is None
+            # a fresh cache finds the runs on disk; a tiny size limit evicts them
+            assert ResultCache(directory).get(other, 10)[-1] == games[1][-1]
+            ResultCache(directory, max_disk_bytes=1).run_gol(state, T=40)
+            assert os.listdir(directory) == []
+
+    def test_soups(self):
+        specs = spawn_soups(7, 6, height=30, width=40, density=0.3)
+        # a trial is reproducible from its spec alone, in any order or process
+        assert SoupSpec(7, 3, 30, 40, 0.3).to_state() == specs[3].to_state()
+        assert np.array_equal(soup_batch(specs[::-1])[0], specs[-1].board())
+        assert specs[0].to_state() != specs[1].to_state()
+        assert GOLState.random_init(p=[0.7, 0.3], seed=1) == GOLState.random_init(p=[0.7, 0.3], seed=1)
+        games = batched_run_gol(specs, T=10)
+        assert all(a[-1] == b[-1] for a, b in zip(games, batched_run_gol(specs, T=10, num_procs=2)))
+
+    def test_adaptive_trials(self):
+        means = [0.0, 5.0, 5.3, 10.0, 10.0]
+        def run_trials(arm, start, n):
+            return list(np.random.default_rng((arm, start)).normal(means[arm], 1.0, n))
+        arms = AdaptiveTrials(run_trials, list(range(5)), tolerance=0.5)()
+        # the clear gap stops at the first round, the close pair gets the most trials
+        assert arms[0].n == 10 and arms[1].n > arms[3].n and arms[2].n > arms[4].n
+        assert all(abs(arm.mean - m) < 0.5 for arm, m in zip(arms, means))
+        assert [arm.n for arm in AdaptiveTrials(lambda v, start, n: [v] * n, [1, 2, 2])()] == [10, 10, 10]
+
+    def test_fused_execution(self):
+        class DensityExperiment(DeclarativeExperiment):
+            def __init__(self, densities, T):
+                super().__init__(Hypothesis(text=""))
+                self.densities, self.T = densities, T
+
+            def arms(self):
+                return [Arm(IndependentVariable(value=p, description="density"),
+                            spawn_soups(0, 6, height=20, width=20, density=p),
+                            lambda game: (game[-1].state.sum(), len(game)), ("live cells", "frames"), T=self.T)
+                        for p in self.densities]
+
+        experiments = [DensityExperiment([0.2, 0.5], T=12), DensityExperiment([0.5], T=5)]
+        # a small max_bytes forces chunks that mix arms of both experiments
+        fused = execute(experiments, max_bytes=20 * 20 * 13 * 4)
+        for experiment, results in zip(experiments, fused):
+            assert results.results == experiment().results
+            for indep_var, live_cells, frames in results.results:
+                games = batched_run_gol(spawn_soups(0, 6, height=20, width=20, density=indep_var.value), T=experiment.T)
+                assert live_cells.value == np.mean([game[-1].state.sum() for game in games])
+                assert frames.value == experiment.T + 1
+        # every chunk stays within max_bytes when run to its longest horizon
+        cache = default_cache()
+        with mock.patch.object(cache, "batched_run_gol", wraps=cache.batched_run_gol) as run:
+            run_arms([arm for experiment in experiments for arm in experiment.arms()], max_bytes=20 * 20 * 13 * 4)
+        assert all((kwargs["T"] + 1) * 20 * 20 * len(states) <= 20 * 20 * 13 * 4 for (states,), kwargs in run.call_args_list)
+        assert sum(len(states) for (states,), _ in run.call_args_list) == 18
+
+    def test_sweep_resume(self):
+        trials = {f"trial/{soup.index}": soup for soup in spawn_soups(1, 7, height=30, width=30, density=0.3)}
+        measurements = {"population": FinalPopulation(), "period": CycleDetector()}
+        expected = {}
+        for key, soup in trials.items():
+            # computed apart from the streaming engine: a full run, then the first frame repeating
+            # one of the 32 before it (CycleDetector's default window)
+            frames = [frame.state.tobytes() for frame in run_gol(soup.to_state(), T=300)]
+            period = next((t - s for t in range(len(frames)) for s in range(max(0, t - 32), t) if frames[s] == frames[t]),
+                          None)
+            expected[key] = {"population": int(np.frombuffer(frames[-1], dtype=bool).sum()), "period": period}
+        assert run_sweep(trials, measurements, T=300) == expected
+
+        class CrashingStore(SweepStore):
+            # dies right after writing its third snapshot
+            saves = 0
+
+            def save_state(self, key, state):
+                super().save_state(key, state)
+                CrashingStore.saves += 1
+                if CrashingStore.saves == 3:
+                    raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(KeyboardInterrupt):
+                run_sweep(trials, measurements, T=300, store=CrashingStore(directory), batch_size=3, checkpoint_every=40)
+            store = SweepStore(directory)
+            assert len(os.listdir(os.path.join(directory, "state"))) == 1
+            resumed = run_sweep(trials, measurements, T=300, store=store, batch_size=3, checkpoint_every=40)
+            assert resumed == expected
+            assert len(store.completed()) == 7 and os.listdir(os.path.join(directory, "state")) == []
+
+        class SizedStore(SweepStore):
+            # records the size of every snapshot written
+            sizes = []
+
+            def save_state(self, key, state):
+                super().save_state(key, state)
+                SizedStore.sizes.append(os.path.getsize(self._state_path(key)))
+
+        # a glider on a torus cycles only after 160 generations, past the detectors' window,
+        # so the snapshots must not grow while it runs on
+        glider = GOLState.from_object(GOLObject(x=0, y=0, rle="bo$2bo$3o!"), height=40, width=40)
+        _census = StructureCensus()
+        stats = {"census": _census, "is_still": StillLifeDetector(cycle=_census),
+                 "is_oscillator": OscillatorDetector(cycle=_census)}
+        with tempfile.TemporaryDirectory() as directory:
+            run_sweep({"glider": glider}, stats, T=150, wrap=True, store=SizedStore(directory), checkpoint_every=10)
+        assert len(SizedStore.sizes) == 14 and max(SizedStore.sizes) - SizedStore.sizes[3] < 100
+
 
 # If the script is run directly, run the tests
 if __name__ == '__main__':
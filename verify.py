@@ -0,0 +1,38 @@
+from typing import List
+
+from gol import GOLState, GOLStructure
+from run_gol import batched_run_gol
+
+
+######## Batched Structure Verification ########
+
+def verify_structures(structures: List[GOLStructure], height: int = 100, width: int = 100,
+                      batch_size: int = 128, num_procs: int = 1) -> List[bool]:
+    """
+    Screens many candidate structures with shared batched simulations instead of one run each.
+    Candidates are sorted by horizon() and simulated batch_size at a time, each batch only as far
+    as its longest horizon; every structure's check() then sees its own trajectory cut to its horizon.
+    + height, width: board every candidate is placed on, as in GOLState.from_object
+    + num_procs: forwarded to batched_run_gol
+    return: pass/fail per structure, in input order; a candidate whose RLE cannot be placed (ValueError)
+    or whose measurements fail on its trajectory (ValueError, IndexError, ArithmeticError) fails,
+    while any other error propagates
+    """
+    passed = [False] * len(structures)
+    states = {}
+    for i, structure in enumerate(structures):
+        try:
+            states[i] = GOLState.from_object(structure.object, height=height, width=width)
+        except ValueError:
+            continue
+    order = sorted(states, key=lambda i: structures[i].horizon())
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        T = max(structures[i].horizon() for i in batch) - 1
+        games = batched_run_gol([states[i] for i in batch], T=T, num_procs=num_procs)
+        for i, game in zip(batch, games):
+            try:
+                passed[i] = bool(structures[i].check(game[:structures[i].horizon()]))
+            except (ValueError, IndexError, ArithmeticError):
+                passed[i] = False
+    return passed